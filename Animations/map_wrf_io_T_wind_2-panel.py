@@ -10,31 +10,33 @@ basic structure borrowed from wrf-python documentation
 """
 
 
+import os
 import sys
 from glob import glob
 import numpy as np
-from netCDF4 import Dataset
-from wrf import getvar, to_np, latlon_coords, smooth2d, interplevel
+from wrf import to_np, smooth2d
 import matplotlib as mpl
 from matplotlib.cm import get_cmap
-from mpl_toolkits.basemap import Basemap
+from matplotlib.lines import Line2D
+from matplotlib.collections import LineCollection
 mpl.use('Agg')
 import matplotlib.pyplot as plt
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Common'))
+from wrf_cache import get_wrf_fields, level_name
+from parallel_jobs import parse_workers, run_jobs
+from basemap_cache import get_basemap, get_projected_grid
+from map_background import capture_background, save_frame
 
 
 bottom_lat, top_lat = 45.0, 51.0
 mid_lat = (bottom_lat + top_lat) / 2.0
 left_lon, right_lon = -73.0, -64.0
 mid_lon = (left_lon + right_lon) / 2.0
+frames = dict()  # pre-rendered static backgrounds, by WRF grid number
 
 
 def set_up_basemap():
-    mid_lat = (bottom_lat + top_lat) / 2.0
-    mid_lon = (left_lon + right_lon) / 2.0
-    bmap = Basemap(projection='tmerc', lon_0=mid_lon, lat_0=mid_lat,
-                   lat_ts=mid_lat, llcrnrlat=bottom_lat, llcrnrlon=left_lon,
-                   urcrnrlat=top_lat, urcrnrlon=right_lon, resolution='h',
-                   area_thresh=500)
+    bmap = get_basemap(bottom_lat, top_lat, left_lon, right_lon)
     bmap.drawcoastlines()
     bmap.drawstates()
     bmap.drawcountries()
@@ -47,13 +49,9 @@ def set_up_basemap():
     return bmap
 
 
-def plot_upa_windspeed_map(U, V, title):
-    """generate map using matplotlib Basemap module"""
-    bmap  = set_up_basemap()
-    #
-    lats, lons = latlon_coords(U)
-    x, y = bmap(to_np(lons), to_np(lats))
-    #
+def draw_upa_windspeed(bmap, x, y, U, V, ax=None):
+    """draw smoothed wind speed contours and wind barbs, returning the new artists
+    (contour set first)"""
     # generate and smooth the windspeed variable
     windspeed = np.sqrt(to_np(U)**2 + to_np(V)**2)
     spatial_range = 3
@@ -61,96 +59,186 @@ def plot_upa_windspeed_map(U, V, title):
     #
     # draw windspeed with filled contours
     levels = np.arange(0, 25)
-    windspeed_contours = bmap.contourf(x, y, to_np(smooth_windspeed),
+    windspeed_contours = bmap.contourf(x, y, to_np(smooth_windspeed), ax=ax,
                                        levels=levels, cmap=get_cmap('Blues'))
+    #
+    # draw wind barbs
+    interval = 10
+    barbs = bmap.barbs(x[::interval, ::interval], y[::interval, ::interval],
+                       to_np(U[::interval, ::interval]),
+                       to_np(V[::interval, ::interval]), length=4, ax=ax)
+    return [windspeed_contours] + list(barbs)
+
+
+def add_windspeed_colorbar(windspeed_contours):
     cbar = plt.colorbar(windspeed_contours, pad=0.02, shrink=0.9)
     labels = np.arange(0, 25, 3)
     cbar.ax.set_yticks(labels)
     cbar.ax.set_yticklabels(labels=labels, fontsize=14)
     cbar.ax.set_ylabel('wind speed [m/s]', fontsize=14)
-    #
-    # draw wind barbs
-    interval = 10
-    bmap.barbs(x[::interval, ::interval], y[::interval, ::interval],
-               to_np(U[::interval, ::interval]),
-               to_np(V[::interval, ::interval]), length=4)
-    #
-    plt.title(title, fontsize=14)
     return
 
 
-def plot_sfc_T_wind_map(T2, U10, V10, title):
-    """generate map using matplotlib Basemap module"""
-    bmap = set_up_basemap()
-    #
-    lats, lons = latlon_coords(T2)
-    x, y = bmap(to_np(lons), to_np(lats))
-    #
+def draw_sfc_T_wind(bmap, x, y, T2, U10, V10, ax=None):
+    """draw smoothed T2 contours and wind barbs, returning the new artists
+    (contour set first)"""
     # smooth the T2 variable
     spatial_range = 3
     smooth_T2 = smooth2d(T2, spatial_range)
     #
     # draw T2 with filled contours
     levels = np.arange(4, 35)
-    T2_contours = bmap.contourf(x, y, to_np(smooth_T2),
+    T2_contours = bmap.contourf(x, y, to_np(smooth_T2), ax=ax,
                                 levels=levels, cmap=get_cmap('plasma'))
+    #
+    # draw wind barbs
+    interval = 10
+    barbs = bmap.barbs(x[::interval, ::interval], y[::interval, ::interval],
+                       to_np(U10[::interval, ::interval]),
+                       to_np(V10[::interval, ::interval]), length=4, ax=ax)
+    return [T2_contours] + list(barbs)
+
+
+def add_T_colorbar(T2_contours):
     cbar = plt.colorbar(T2_contours, pad=0.02, shrink=0.9)
     labels = np.arange(4, 35, 3)
     cbar.ax.set_yticks(labels)
     cbar.ax.set_yticklabels(labels=labels, fontsize=14)
     cbar.ax.set_ylabel(r'$T_{sfc}$ [$^{\circ}$C]', fontsize=14)
+    return
+
+
+def plot_upa_windspeed_map(lats, lons, U, V, title):
+    """generate map using matplotlib Basemap module"""
+    bmap  = set_up_basemap()
     #
-    # draw wind barbs
-    interval = 10
-    bmap.barbs(x[::interval, ::interval], y[::interval, ::interval],
-               to_np(U10[::interval, ::interval]),
-               to_np(V10[::interval, ::interval]), length=4)
+    x, y = get_projected_grid(bmap, lats, lons)
+    artists = draw_upa_windspeed(bmap, x, y, U, V)
+    add_windspeed_colorbar(artists[0])
     #
     plt.title(title, fontsize=14)
     return
 
 
-print()
-sim_date = sys.argv[1]
-path = '../Data/%s/WRF' % sim_date
-ncfnames = sorted(glob('%s/*.nc' % path))
-print('found %d files' % len(ncfnames))
-print()
-#
-for ncfname in ncfnames:
-    fig = plt.figure(figsize=(8, 14))
+def plot_sfc_T_wind_map(lats, lons, T2, U10, V10, title):
+    """generate map using matplotlib Basemap module"""
+    bmap = set_up_basemap()
     #
+    x, y = get_projected_grid(bmap, lats, lons)
+    artists = draw_sfc_T_wind(bmap, x, y, T2, U10, V10)
+    add_T_colorbar(artists[0])
+    #
+    plt.title(title, fontsize=14)
+    return
+
+
+def set_up_frame(lats, lons, U_prs, V_prs, T2, U10, V10, titles):
+    """build the 2-panel figure with all static map layers and colorbars
+    (using one hour's fields for the colorbars), and capture it, keeping
+    the map line work on top of each frame's contours"""
+    fig = plt.figure(figsize=(8, 14), dpi=300)
+    ax_upa = fig.add_subplot(2, 1, 1)
+    bmap_upa = set_up_basemap()
+    overlays = [artist for artist in ax_upa.get_children()
+                if isinstance(artist, (Line2D, LineCollection))]
+    x, y = get_projected_grid(bmap_upa, lats, lons)
+    artists = draw_upa_windspeed(bmap_upa, x, y, U_prs, V_prs, ax=ax_upa)
+    add_windspeed_colorbar(artists[0])
+    upa_title = ax_upa.set_title(titles[0], fontsize=14)
+    for artist in artists:
+        artist.remove()
+    #
+    ax_sfc = fig.add_subplot(2, 1, 2)
+    bmap_sfc = set_up_basemap()
+    overlays.extend([artist for artist in ax_sfc.get_children()
+                     if isinstance(artist, (Line2D, LineCollection))])
+    artists = draw_sfc_T_wind(bmap_sfc, x, y, T2, U10, V10, ax=ax_sfc)
+    add_T_colorbar(artists[0])
+    sfc_title = ax_sfc.set_title(titles[1], fontsize=14)
+    for artist in artists:
+        artist.remove()
+    #
+    plt.tight_layout()
+    frame = capture_background(fig, [upa_title, sfc_title], overlays)
+    frame.update({'bmaps': (bmap_upa, bmap_sfc), 'axes': (ax_upa, ax_sfc),
+                  'x': x, 'y': y})
+    return frame
+
+
+def plot_wrf_file(ncfname, use_background=False):
+    """plot 2-panel upper-air / surface map frame for one WRF file"""
     grid_num = int(ncfname.split('/')[-1].split('.')[0].split('_')[2][-1:])
     date_str = ncfname.split('/')[-1].split('.')[0].split('_')[3]
     time_str = ncfname.split('/')[-1].split('.')[0].split('_')[4][:-3]
     #
-    ncfile = Dataset(ncfname, 'r')
-    T2 = getvar(ncfile, 'T2')
-    U10 = getvar(ncfile, 'u10_e')
-    V10 = getvar(ncfile, 'v10_e')
-    P = getvar(ncfile, 'pressure')
-    U = getvar(ncfile, 'ue_unstaggered')
-    V = getvar(ncfile, 've_unstaggered')
+    prs = 900
+    fields = get_wrf_fields(ncfname, ['T2', 'u10_e', 'v10_e',
+                                      level_name('ue_unstaggered', prs),
+                                      level_name('ve_unstaggered', prs)])
+    lats, lons = fields['lats'], fields['lons']
+    U_prs = fields[level_name('ue_unstaggered', prs)]
+    V_prs = fields[level_name('ve_unstaggered', prs)]
+    T2, U10, V10 = fields['T2'], fields['u10_e'], fields['v10_e']
+    upa_title = 'WRF-NARR grid %d %d hPa wind speed at %s %s UTC' % (grid_num, prs, date_str, time_str)
+    sfc_title = 'WRF-NARR grid %d surface T + winds at %s %s UTC' % (grid_num, date_str, time_str)
+    fname = 'WRF_d%s_%s_%s_sfc_T_wind_900hPa_windspeed.png' % (str(grid_num).zfill(2), date_str, time_str)
+    #
+    if use_background:
+        if grid_num not in frames:
+            print('rendering static map background for grid %d' % grid_num)
+            frames[grid_num] = set_up_frame(lats, lons, U_prs, V_prs, T2, U10, V10,
+                                            [upa_title, sfc_title])
+        frame = frames[grid_num]
+        bmap_upa, bmap_sfc = frame['bmaps']
+        ax_upa, ax_sfc = frame['axes']
+        x, y = frame['x'], frame['y']
+        print('plotting %d hPa T/wind for %s' % (prs, ncfname))
+        artists = draw_upa_windspeed(bmap_upa, x, y, U_prs, V_prs, ax=ax_upa)
+        ax_upa.set_title(upa_title, fontsize=14)
+        print('plotting surface T/wind for %s' % ncfname)
+        artists.extend(draw_sfc_T_wind(bmap_sfc, x, y, T2, U10, V10, ax=ax_sfc))
+        ax_sfc.set_title(sfc_title, fontsize=14)
+        save_frame(frame, artists, fname)
+        print()
+        return
+    #
+    fig = plt.figure(figsize=(8, 14))
     #
     fig.add_subplot(2, 1, 1)
-    prs = 900
     print('plotting %d hPa T/wind for %s' % (prs, ncfname))
-    U_prs = interplevel(U, P, prs)
-    V_prs = interplevel(V, P, prs)
-    title = 'WRF-NARR grid %d %d hPa wind speed at %s %s UTC' % (grid_num, prs, date_str, time_str)
-    plot_upa_windspeed_map(U_prs, V_prs, title)
+    plot_upa_windspeed_map(lats, lons, U_prs, V_prs, upa_title)
     #
     fig.add_subplot(2, 1, 2)
     print('plotting surface T/wind for %s' % ncfname)
-    title = 'WRF-NARR grid %d surface T + winds at %s %s UTC' % (grid_num, date_str, time_str)
-    plot_sfc_T_wind_map(T2, U10, V10, title)
+    plot_sfc_T_wind_map(lats, lons, T2, U10, V10, sfc_title)
     #
     plt.tight_layout()
-    fname = 'WRF_d%s_%s_%s_sfc_T_wind_900hPa_windspeed.png' % (str(grid_num).zfill(2), date_str, time_str)
     plt.savefig(fname, dpi=300, bbox_inches='tight')
     print('- saved %s' % fname)
     plt.close()
     #
     print()
+    return
+
+
+def main(args):
+    """render the 2-panel WRF map frames for every output time of a night"""
+    print()
+    args, workers = parse_workers(list(args))
+    use_background = '--background' in args
+    if use_background:
+        args.remove('--background')
+    sim_date = args[0]
+    path = '../Data/%s/WRF' % sim_date
+    ncfnames = sorted(glob('%s/*.nc' % path))
+    print('found %d files' % len(ncfnames))
+    print()
+    #
+    run_jobs(plot_wrf_file, [(ncfname, use_background) for ncfname in ncfnames], workers)
+    return
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
 
 # end map_wrf_io_T_wind_2-panel.py
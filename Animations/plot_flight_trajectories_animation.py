@@ -9,6 +9,7 @@ Copyright (C) 2021 by Matthew Garcia
 """
 
 
+import os
 import sys
 from glob import glob
 import numpy as np
@@ -17,9 +18,13 @@ from netCDF4 import Dataset
 from wrf import getvar, latlon_coords
 import matplotlib as mpl
 from matplotlib.cm import get_cmap
-from mpl_toolkits.basemap import Basemap
+from matplotlib.collections import LineCollection
 mpl.use('Agg')
 import matplotlib.pyplot as plt
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Common'))
+from basemap_cache import get_basemap, get_projected_grid
+from map_background import capture_background, save_frame, add_to_frame, save_current_frame
+from trajectory_drawing import draw_trajectories
 
 
 bottom_lat, top_lat = 45.0, 51.0
@@ -29,10 +34,7 @@ mid_lon = (left_lon + right_lon) / 2.0
 
 
 def set_up_basemap():
-    bmap = Basemap(projection='tmerc', lon_0=mid_lon, lat_0=mid_lat,
-                   lat_ts=mid_lat, llcrnrlat=bottom_lat, llcrnrlon=left_lon,
-                   urcrnrlat=top_lat, urcrnrlon=right_lon, resolution='h',
-                   area_thresh=500)
+    bmap = get_basemap(bottom_lat, top_lat, left_lon, right_lon)
     bmap.drawcoastlines()
     bmap.drawstates()
     bmap.drawcountries()
@@ -48,7 +50,7 @@ def set_up_basemap():
 def plot_topography(bmap, topography):
     '''plot topography from WRF, with colorbar'''
     wrf_lats, wrf_lons = latlon_coords(topography)
-    lons, lats = bmap(wrf_lons, wrf_lats)
+    lons, lats = get_projected_grid(bmap, wrf_lats, wrf_lons)
     bmap.contourf(lons, lats, topography, 48, cmap=get_cmap('gist_earth'))
     cbar = plt.colorbar(pad=0.02, shrink=0.75)
     labels = np.arange(0, 1075, 125)
@@ -58,121 +60,229 @@ def plot_topography(bmap, topography):
     return
 
 
+def read_sbw_locations(fname):
+    '''read flier IDs and locations from one simulation output time'''
+    locs_df = pd.read_csv(fname, index_col=None)
+    locs_df = locs_df.rename(columns = {'Unnamed: 0':'sbw_ID'})
+    sbw_ids = np.array(locs_df['sbw_ID'])
+    lats = np.array(locs_df['lat']).astype(np.float32)
+    lons = np.array(locs_df['lon']).astype(np.float32)
+    alts = np.array(locs_df['alt_AGL']).astype(np.float32)
+    return sbw_ids, lats, lons, alts
+
+
+def init_sbw_locations(fname, n_frames):
+    '''set up columnar trajectory buffer from the initial output time
+
+    lat/lon/alt arrays are (n_frames, n_fliers), one column per flier, with
+    each flier's recorded locations filling its column from the top;
+    count holds the number of recorded locations per flier and airborne
+    whether its latest recorded location is in the air
+    '''
+    sbw_ids, lats, lons, alts = read_sbw_locations(fname)
+    n_fliers = len(sbw_ids)
+    locations = {'index': pd.Index(sbw_ids),
+                 'lat': np.full((n_frames, n_fliers), np.nan, dtype=np.float32),
+                 'lon': np.full((n_frames, n_fliers), np.nan, dtype=np.float32),
+                 'alt': np.full((n_frames, n_fliers), np.nan, dtype=np.float32),
+                 'count': np.ones(n_fliers, dtype=np.int32),
+                 'airborne': alts > 0.0}
+    locations['lat'][0] = lats
+    locations['lon'][0] = lons
+    locations['alt'][0] = alts
+    return locations
+
+
 def add_sbw_locations(locations, fname):
     '''read new file and add flier locations to record'''
-    new_locs_df = pd.read_csv(fname, index_col=None)
-    new_locs_df = new_locs_df.rename(columns = {'Unnamed: 0':'sbw_ID'})
-    #
-    # add the location of an SBW on the ground only if its previous location was in the air
-    ground_df = new_locs_df[new_locs_df['alt_AGL'] == 0.0]
-    if len(ground_df):
-        sbw_ids = list(ground_df['sbw_ID'])
-        lats = np.array(ground_df['lat'])
-        lons = np.array(ground_df['lon'])
-        alts = np.array(ground_df['alt_AGL'])
-        for i, sbw_id in enumerate(sbw_ids):
-            if locations[sbw_id][-1][2] > 0.0:
-                locations[sbw_id].append((lats[i], lons[i], alts[i]))
+    sbw_ids, lats, lons, alts = read_sbw_locations(fname)
+    cols = locations['index'].get_indexer(sbw_ids)
+    known = cols >= 0
+    cols, lats, lons, alts = cols[known], lats[known], lons[known], alts[known]
     #
-    # add the location of any SBW in the air
-    fliers_df = new_locs_df[new_locs_df['alt_AGL'] > 0.0]
-    if len(fliers_df):
-        sbw_ids = list(fliers_df['sbw_ID'])
-        lats = np.array(fliers_df['lat'])
-        lons = np.array(fliers_df['lon'])
-        alts = np.array(fliers_df['alt_AGL'])
-        for i, sbw_id in enumerate(sbw_ids):
-            locations[sbw_id].append((lats[i], lons[i], alts[i]))
+    # add the location of any SBW in the air, and of an SBW on the ground
+    # only if its previous location was in the air
+    airborne = alts > 0.0
+    append = airborne | ((alts == 0.0) & locations['airborne'][cols])
+    cols = cols[append]
+    rows = locations['count'][cols]
+    locations['lat'][rows, cols] = lats[append]
+    locations['lon'][rows, cols] = lons[append]
+    locations['alt'][rows, cols] = alts[append]
+    locations['count'][cols] += 1
+    locations['airborne'][cols] = airborne[append]
     return locations
 
 
 def plot_sbw_locations(bmap, locations, last_frame=False):
-    '''plot flier locations and trajectories'''
-    for sbw, locs in locations.items():
-        nlocs = len(locs)
-        if nlocs == 1:
-            lat = locs[0][0]
-            lon = locs[0][1]
-            bmap.plot(lon, lat, '+', markersize=10, color='k', latlon=True)
-        else:  # nlocs > 1
-            lats = list()
-            lons = list()
-            alts = list()
-            for loc in locs:
-                lats.append(loc[0])
-                lons.append(loc[1])
-                alts.append(loc[2])
-            bmap.plot(lons[0], lats[0], '+', markersize=10, color='k', latlon=True)
-            if (alts[-1] == 0.0) or last_frame:
-                bmap.plot(lons[-1], lats[-1], 'x', markersize=10, color='k', latlon=True)
-            bmap.plot(lons, lats, linewidth=1, color='orange', latlon=True)
-    return
+    '''plot flier locations and trajectories, returning the new artists'''
+    count = locations['count']
+    track_lats = [locations['lat'][:nlocs, col] for col, nlocs in enumerate(count)]
+    track_lons = [locations['lon'][:nlocs, col] for col, nlocs in enumerate(count)]
+    last_alts = locations['alt'][count-1, np.arange(len(count))]
+    ended = (count > 1) & ((last_alts == 0.0) | last_frame)
+    return draw_trajectories(bmap, track_lats, track_lons, ended)
 
 
-def generate_plot(topography, fname, locations, last_frame=False):
-    '''generate plot of topography, SBW locations, and trajectories for a specific time'''
-    plt.figure(figsize=(8, 8))
+def set_up_frame(topography, title):
+    '''render the static map and topography once, for use as a frame background'''
+    fig = plt.figure(figsize=(8, 8), dpi=300)
     bmap = set_up_basemap()
     plot_topography(bmap, topography)
-    plot_sbw_locations(bmap, locations, last_frame)
+    title_text = plt.title(title, fontsize=14)
+    plt.tight_layout()
+    frame = capture_background(fig, [title_text])
+    frame['bmap'] = bmap
+    return frame
+
+
+def set_up_incremental_artists(frame):
+    '''persistent artists for the incremental renderer, reused for every frame'''
+    ax = frame['fig'].axes[0]
+    ax.set_autoscale_on(False)
+    tracks = LineCollection([], linewidths=1, colors='orange')
+    ax.add_collection(tracks, autolim=False)
+    starts, = ax.plot([], [], '+', markersize=10, color='k')
+    ends, = ax.plot([], [], 'x', markersize=10, color='k')
+    return {'tracks': tracks, 'starts': starts, 'ends': ends, 'n_drawn': None}
+
+
+def update_incremental_plot(frame, artists, locations, last_frame=False):
+    '''draw only the trajectory segments and markers added since the previous
+    frame onto the retained canvas'''
+    count = locations['count']
+    n_old = artists['n_drawn']
+    if n_old is None:
+        n_old = np.zeros_like(count)
+    ncols = np.arange(len(count))
+    #
+    # segments ending at buffer rows not yet drawn for each flier
+    rows = np.arange(1, locations['lat'].shape[0])[:, np.newaxis]
+    seg_rows, seg_cols = np.nonzero((rows >= np.maximum(n_old, 1)) & (rows < count))
+    seg_rows = seg_rows + 1
+    seg_lats = np.stack((locations['lat'][seg_rows-1, seg_cols],
+                         locations['lat'][seg_rows, seg_cols]), axis=-1)
+    seg_lons = np.stack((locations['lon'][seg_rows-1, seg_cols],
+                         locations['lon'][seg_rows, seg_cols]), axis=-1)
+    #
+    # start markers for fliers not yet drawn, end markers for fliers that
+    # have just landed (or are still in the air at the end of the night)
+    start_cols = ncols[n_old == 0]
+    last_alts = locations['alt'][count-1, ncols]
+    grown = count > np.maximum(n_old, 1)
+    ended = grown & (last_alts == 0.0)
+    if last_frame:
+        ended = ended | (~grown & (count > 1) & (last_alts > 0.0))
+    end_cols = ncols[ended]
+    artists['n_drawn'] = count.copy()
+    #
+    bmap = frame['bmap']
+    new_artists = list()
+    if len(seg_cols):
+        seg_x, seg_y = bmap(seg_lons, seg_lats)
+        artists['tracks'].set_segments(np.stack((seg_x, seg_y), axis=-1))
+        new_artists.append(artists['tracks'])
+    for key, rows, cols in [('starts', np.zeros_like(start_cols), start_cols),
+                            ('ends', count[end_cols]-1, end_cols)]:
+        if len(cols):
+            x, y = bmap(locations['lon'][rows, cols], locations['lat'][rows, cols])
+            artists[key].set_data(x, y)
+            new_artists.append(artists[key])
+    add_to_frame(frame, new_artists)
+    return
+
+
+def generate_plot(sim_date, topography, fname, locations, last_frame=False, frame=None):
+    '''generate plot of topography, SBW locations, and trajectories for a specific time,
+    optionally drawing only the SBW layer over a pre-rendered background frame'''
     datetimestr = fname.split('/')[-1].split('_')[1].split('+')[0]
     datestr, timestr = datetimestr.split('T')
     title = '%s SBW dispersal simulation: %s at %s UTC' % (sim_date, datestr, timestr[:-3])
+    outfname = '%s_flight_trajectories_%s_%s.png' % (sim_date, datestr, timestr[:-3])
+    if frame is not None:
+        frame['titles'][0].set_text(title)
+        if 'artists' in frame:
+            update_incremental_plot(frame, frame['artists'], locations, last_frame)
+            save_current_frame(frame, outfname)
+        else:
+            artists = plot_sbw_locations(frame['bmap'], locations, last_frame)
+            save_frame(frame, artists, outfname)
+        return
+    plt.figure(figsize=(8, 8))
+    bmap = set_up_basemap()
+    plot_topography(bmap, topography)
+    plot_sbw_locations(bmap, locations, last_frame)
     plt.title(title, fontsize=14)
     plt.tight_layout()
-    outfname = '%s_flight_trajectories_%s_%s.png' % (sim_date, datestr, timestr[:-3])
     plt.savefig(outfname, dpi=300, bbox_inches='tight')
     print('- saved %s' % outfname)
     plt.close()
     return
 
 
-print()
-sim_date = sys.argv[1]
-rep_num = str(int(sys.argv[2])).zfill(5)
-output_interval = int(sys.argv[3])
-#
-# get topography from WRF
-path = '../Data/%s/WRF' % sim_date
-ncfnames = sorted(glob('%s/*.nc' % path))
-print('reading WRF topography from %s' % ncfnames[0].split('/')[-1])
-ncfile = Dataset(ncfnames[0], 'r')
-topography = getvar(ncfile, 'HGT')
-#
-# get animation map times and file list
-path = '../Data/%s/pyATM/WRF-NARR_d03_%s_simulation_%s_summary' % (sim_date, sim_date, rep_num)
-allfnames = sorted(glob('%s/locs_*_%s.csv' % (path, rep_num)))
-print('found %d simulation output times with SBW locations' % len(allfnames))
-final_fname = allfnames[-1]
-locfnames = list()
-for fname in allfnames:
-    mins = int(fname.split('/')[-1].split('.')[0].split('_')[1].split(':')[1])
-    if (mins % output_interval) == 0:
-        locfnames.append(fname)
-if locfnames[-1] != final_fname:
-    locfnames.append(final_fname)
-print('reduced to %d output times at %d-min intervals' % (len(locfnames), output_interval))
-#
-# get locations at initial time and set up dict structure
-sbw_locations = dict()
-locs_df = pd.read_csv(locfnames[0], index_col=None)
-locs_df = locs_df.rename(columns = {'Unnamed: 0':'sbw_ID'})
-sbw_ids = list(locs_df['sbw_ID'])
-lats = np.array(locs_df['lat'])
-lons = np.array(locs_df['lon'])
-alts = np.array(locs_df['alt_AGL'])
-for i, sbw_id in enumerate(sbw_ids):
-    sbw_locations[sbw_id] = [(lats[i], lons[i], alts[i])]
-#
-# plot initial locations
-generate_plot(topography, locfnames[0], sbw_locations)
-#
-# plot trajectories
-for fname in locfnames[1:]:
-    sbw_locations = add_sbw_locations(sbw_locations, fname)
-    generate_plot(topography, fname, sbw_locations)
-generate_plot(topography, locfnames[-1], sbw_locations, last_frame=True)
-#
-print()
+def main(args):
+    """render the flight trajectory animation frames of a replicate"""
+    print()
+    args = list(args)
+    use_background = '--background' in args
+    if use_background:
+        args.remove('--background')
+    use_incremental = '--incremental' in args
+    if use_incremental:
+        args.remove('--incremental')
+    sim_date = args[0]
+    rep_num = str(int(args[1])).zfill(5)
+    output_interval = int(args[2])
+    #
+    # get topography from WRF
+    path = '../Data/%s/WRF' % sim_date
+    ncfnames = sorted(glob('%s/*.nc' % path))
+    print('reading WRF topography from %s' % ncfnames[0].split('/')[-1])
+    ncfile = Dataset(ncfnames[0], 'r')
+    topography = getvar(ncfile, 'HGT')
+    #
+    # get animation map times and file list
+    path = '../Data/%s/pyATM/WRF-NARR_d03_%s_simulation_%s_summary' % (sim_date, sim_date, rep_num)
+    allfnames = sorted(glob('%s/locs_*_%s.csv' % (path, rep_num)))
+    print('found %d simulation output times with SBW locations' % len(allfnames))
+    final_fname = allfnames[-1]
+    locfnames = list()
+    for fname in allfnames:
+        mins = int(fname.split('/')[-1].split('.')[0].split('_')[1].split(':')[1])
+        if (mins % output_interval) == 0:
+            locfnames.append(fname)
+    if locfnames[-1] != final_fname:
+        locfnames.append(final_fname)
+    print('reduced to %d output times at %d-min intervals' % (len(locfnames), output_interval))
+    #
+    # get locations at initial time and set up trajectory buffer
+    sbw_locations = init_sbw_locations(locfnames[0], len(locfnames))
+    print('tracking %d fliers' % len(sbw_locations['count']))
+    #
+    # render static map background once, if requested, and optionally keep
+    # the canvas between frames so that only new trajectory segments are drawn
+    frame = None
+    if use_background or use_incremental:
+        print('rendering static map background')
+        frame = set_up_frame(topography, '%s SBW dispersal simulation: %s at %s UTC' %
+                             (sim_date, '0000-00-00', '00:00'))
+    if use_incremental:
+        frame['artists'] = set_up_incremental_artists(frame)
+    #
+    # plot initial locations
+    generate_plot(sim_date, topography, locfnames[0], sbw_locations, frame=frame)
+    #
+    # plot trajectories
+    for fname in locfnames[1:]:
+        sbw_locations = add_sbw_locations(sbw_locations, fname)
+        generate_plot(sim_date, topography, fname, sbw_locations, frame=frame)
+    generate_plot(sim_date, topography, locfnames[-1], sbw_locations, last_frame=True, frame=frame)
+    #
+    print()
+    return
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
 
 # end plot_flight_trajectories_animation.py
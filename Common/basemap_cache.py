@@ -0,0 +1,96 @@
+"""
+Python module "basemap_cache.py"
+by Matthew Garcia, Post-doctoral Research Associate
+Dept. of Forest and Wildlife Ecology
+University of Wisconsin - Madison
+matt.e.garcia@gmail.com
+
+Copyright (C) 2021 by Matthew Garcia
+
+Domain-keyed cache of the transverse Mercator Basemap instances used by
+all map figures. Reading and clipping the high-resolution coastline data
+is done once per domain; the instance is then pickled to Data/cache and
+reused in memory for every later frame. Projected x/y coordinates of
+lat/lon grids (e.g. the WRF mass grid) are cached in the same way.
+"""
+
+
+import os
+import copy
+import pickle
+import hashlib
+import numpy as np
+from mpl_toolkits.basemap import Basemap
+
+
+default_cache_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                 '..', 'Data', 'cache')
+basemaps = dict()
+projected_grids = dict()
+
+
+def basemap_key(bottom_lat, top_lat, left_lon, right_lon, resolution, area_thresh):
+    """identify a map domain and coastline resolution"""
+    return 'tmerc_%.4f_%.4f_%.4f_%.4f_%s_%d' % \
+        (bottom_lat, top_lat, left_lon, right_lon, resolution, area_thresh)
+
+
+def get_basemap(bottom_lat, top_lat, left_lon, right_lon, resolution='h',
+                area_thresh=500, cache_dir=None):
+    """return the tmerc Basemap for a domain, from memory or disk if possible
+
+    each call returns a shallow copy of the cached instance, since Basemap
+    keeps per-axes drawing state (e.g. the map boundary patch)
+    """
+    key = basemap_key(bottom_lat, top_lat, left_lon, right_lon, resolution, area_thresh)
+    if key in basemaps:
+        return copy.copy(basemaps[key])
+    if cache_dir is None:
+        cache_dir = default_cache_dir
+    fname = os.path.join(cache_dir, 'basemap_%s.pkl' % key)
+    if os.path.exists(fname):
+        with open(fname, 'rb') as f:
+            bmap = pickle.load(f)
+    else:
+        mid_lat = (bottom_lat + top_lat) / 2.0
+        mid_lon = (left_lon + right_lon) / 2.0
+        bmap = Basemap(projection='tmerc', lon_0=mid_lon, lat_0=mid_lat,
+                       lat_ts=mid_lat, llcrnrlat=bottom_lat, llcrnrlon=left_lon,
+                       urcrnrlat=top_lat, urcrnrlon=right_lon, resolution=resolution,
+                       area_thresh=area_thresh)
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_fname = '%s.%d.tmp' % (fname, os.getpid())
+        with open(tmp_fname, 'wb') as f:
+            pickle.dump(bmap, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_fname, fname)
+    basemaps[key] = bmap
+    return copy.copy(bmap)
+
+
+def get_projected_grid(bmap, lats, lons, cache_dir=None):
+    """return map x, y for a 2D lat/lon grid, from memory or disk if possible"""
+    lats = np.asarray(lats)
+    lons = np.asarray(lons)
+    sha = hashlib.sha1()
+    sha.update(('%r' % (bmap.projparams,)).encode())
+    sha.update(np.ascontiguousarray(lats, dtype=np.float64).tobytes())
+    sha.update(np.ascontiguousarray(lons, dtype=np.float64).tobytes())
+    key = sha.hexdigest()[:16]
+    if key in projected_grids:
+        return projected_grids[key]
+    if cache_dir is None:
+        cache_dir = default_cache_dir
+    fname = os.path.join(cache_dir, 'projected_grid_%s.npz' % key)
+    if os.path.exists(fname):
+        with np.load(fname) as npz:
+            x, y = npz['x'], npz['y']
+    else:
+        x, y = bmap(lons, lats)
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_fname = '%s.%d.tmp.npz' % (fname[:-4], os.getpid())
+        np.savez(tmp_fname, x=x, y=y)
+        os.replace(tmp_fname, fname)
+    projected_grids[key] = (x, y)
+    return x, y
+
+# end basemap_cache.py
@@ -0,0 +1,81 @@
+"""
+Python module "csv_loader.py"
+by Matthew Garcia, Post-doctoral Research Associate
+Dept. of Forest and Wildlife Ecology
+University of Wisconsin - Madison
+matt.e.garcia@gmail.com
+
+Copyright (C) 2021 by Matthew Garcia
+
+Bulk reading of many small pyATM output CSV files (flier reports, landing
+locations, egg deposition). Files are read concurrently with a thread pool
+(or a process pool), since reading thousands of files one after another
+is dominated by file-system latency, and only the requested columns are
+parsed, with explicit compact dtypes. Files can be loaded all together or
+streamed one at a time, so that large file sets can be aggregated without
+holding every file in memory.
+"""
+
+
+from collections import deque
+import multiprocessing as mp
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import pandas as pd
+
+
+default_workers = 8
+
+
+def read_csv_file(fname, columns=None, index_col=False):
+    """read one CSV file, optionally only the columns in a
+    {name: dtype} dict"""
+    if columns is None:
+        return pd.read_csv(fname, index_col=index_col, low_memory=False)
+    return pd.read_csv(fname, index_col=index_col, usecols=list(columns), dtype=columns)
+
+
+def read_csv_files(fnames, columns=None, workers=default_workers, processes=False,
+                   index_col=False):
+    """read a set of CSV files concurrently, returning a list of DataFrames
+    in file order"""
+    fnames = list(fnames)
+    workers = max(1, min(workers, len(fnames)))
+    if workers == 1:
+        return [read_csv_file(fname, columns, index_col) for fname in fnames]
+    print('reading %d files on %d %s' %
+          (len(fnames), workers, 'processes' if processes else 'threads'))
+    if processes:
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context('fork'))
+    else:
+        pool = ThreadPoolExecutor(max_workers=workers)
+    with pool:
+        dfs = list(pool.map(read_csv_file, fnames, [columns] * len(fnames),
+                            [index_col] * len(fnames)))
+    return dfs
+
+
+def iter_csv_files(fnames, columns=None, workers=default_workers, index_col=False):
+    """read a set of CSV files concurrently, yielding one DataFrame per file
+    in file order; at most workers+1 files are held in memory at once"""
+    fnames = list(fnames)
+    workers = max(1, min(workers, len(fnames)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for fname in fnames:
+            pending.append(pool.submit(read_csv_file, fname, columns, index_col))
+            if len(pending) > workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def load_csv_files(fnames, columns=None, workers=default_workers, processes=False,
+                   index_col=False):
+    """read a set of CSV files concurrently into one DataFrame"""
+    dfs = read_csv_files(fnames, columns, workers, processes, index_col)
+    if not dfs:
+        return pd.DataFrame({name: pd.Series(dtype=dtype) for name, dtype in
+                             (columns or dict()).items()})
+    return pd.concat(dfs, axis=0, ignore_index=True)
+
+# end csv_loader.py
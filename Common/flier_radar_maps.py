@@ -0,0 +1,300 @@
+"""
+Python module "flier_radar_maps.py"
+by Matthew Garcia, Post-doctoral Research Associate
+Dept. of Forest and Wildlife Ecology
+University of Wisconsin - Madison
+matt.e.garcia@gmail.com
+
+Copyright (C) 2021 by Matthew Garcia
+
+Two-panel hexbin maps of simulated flier counts and XAM radar reflectivity
+for selected radar scan times, and their agreement statistics, shared by
+the Fig_05 and Fig_08 scripts. Each script supplies its map settings (map
+bounds, reflectivity range, radar location and flier count colorbar
+ticks); a night's inputs are passed to every function as a small dict (see
+set_up_night), with the radar archive given by its directory so that scan
+jobs in worker processes open it themselves. With use_background, the map
+layers and colorbars are rendered once per night and process and reused
+for every scan.
+"""
+
+
+import os
+from functools import partial
+import numpy as np
+import pandas as pd
+from matplotlib.cm import get_cmap
+import matplotlib.pyplot as plt
+from matplotlib.lines import Line2D
+from matplotlib.text import Text
+from matplotlib.collections import LineCollection
+from basemap_cache import get_basemap
+from hex_bins import hex_lattice, accumulate_hexbin, accumulate_hexbin_stack, hexbin_values, draw_hexbin
+from hex_agreement import agreement_metrics
+from csv_loader import read_csv_files
+from radar_archive import get_radar_archive, open_radar_archive, get_radar_scan
+from parallel_jobs import run_jobs
+from map_background import capture_background, save_frame
+
+
+frames = dict()  # pre-rendered map backgrounds, by figure, night and flier count maximum
+
+
+def set_up_night(settings, sim_date):
+    """read a night's flier count maximum and open (building if necessary)
+    its radar archive"""
+    infname = '../Data/%s/Radar/XAM_fliers_hexbin_counts.csv' % sim_date
+    print('reading %s' % infname.split('/')[-1])
+    count_df = pd.read_csv(infname, index_col=None)
+    archive = get_radar_archive('../Data/%s/Radar' % sim_date)
+    night = {'settings': settings, 'sim_date': sim_date,
+             'maxcount': max(count_df['maxcount']), 'archive_dir': archive['path']}
+    return night, archive
+
+
+def get_flier_locations(infname):
+    fliers_df = pd.read_csv(infname, index_col=None)
+    print('- found %d total fliers in plot area' % len(fliers_df))
+    lats = np.array(fliers_df['lat'])
+    lons = np.array(fliers_df['lon'])
+    return lats, lons
+
+
+def get_radar_field(settings, archive, scan):
+    refl = get_radar_scan(archive, scan)
+    print('- found %d radar data rows' % len(refl))
+    lats = np.array(archive['points']['latitude'])
+    lons = np.array(archive['points']['longitude'])
+    refl_nan = np.where(refl < settings['dBz_min'], np.nan, refl)
+    refl_nan = np.where(refl_nan > settings['dBz_max'], np.nan, refl_nan)
+    return lats, lons, refl_nan
+
+
+def map_extent(settings, bmap):
+    x_min, y_min = bmap(settings['left_lon'], settings['bottom_lat'])
+    x_max, y_max = bmap(settings['right_lon'], settings['top_lat'])
+    return (x_min, x_max, y_min, y_max)
+
+
+def set_up_basemap(settings):
+    bottom_lat, top_lat = settings['bottom_lat'], settings['top_lat']
+    left_lon, right_lon = settings['left_lon'], settings['right_lon']
+    mid_lat = (bottom_lat + top_lat) / 2.0
+    mid_lon = (left_lon + right_lon) / 2.0
+    bmap = get_basemap(bottom_lat, top_lat, left_lon, right_lon)
+    bmap.drawcoastlines()
+    bmap.drawstates()
+    bmap.drawcountries()
+    bmap.drawmapboundary()
+    bmap.drawmapscale(lon=left_lon+0.4, lat=bottom_lat+0.2,
+                      lon0=mid_lon, lat0=mid_lat, length=40.0,
+                      barstyle='fancy')
+    parallels = np.arange(30., 60., 1.)
+    bmap.drawparallels(parallels, labels=[1, 0, 0, 0], fontsize=16)
+    meridians = np.arange(270., 360., 1.)
+    bmap.drawmeridians(meridians, labels=[0, 0, 0, 1], fontsize=16)
+    return bmap, map_extent(settings, bmap)
+
+
+def draw_flier_count(bmap, lattice, lats, lons, maxcount, ax=None):
+    x, y = bmap(lons, lats)
+    totals = accumulate_hexbin(lattice, x, y)
+    hbin = draw_hexbin(bmap, lattice, hexbin_values(totals, 'count'), ax=ax,
+                       vmin=1, vmax=maxcount, cmap=get_cmap('viridis'))
+    return hbin
+
+
+def add_flier_count_colorbar(settings, hbin):
+    cbar = plt.colorbar(hbin, ax=hbin.axes, pad=0.02, shrink=0.75)
+    count_clevs = settings['count_clevs']
+    cbar.set_ticks(count_clevs)
+    cbar.ax.set_yticklabels(count_clevs, fontsize=16, rotation=90, va='center')
+    cbar.ax.set_ylabel('flier count', fontsize=16)
+    return
+
+
+def draw_radar_field(settings, bmap, lattice, lats, lons, refl_nan, ax=None):
+    x, y = bmap(lons, lats)
+    totals = accumulate_hexbin(lattice, x, y, C=refl_nan)
+    hbin = draw_hexbin(bmap, lattice, hexbin_values(totals, 'mean'), ax=ax,
+                       vmin=settings['dBz_min'], vmax=settings['dBz_max'],
+                       cmap=get_cmap('viridis'))
+    return hbin
+
+
+def add_radar_colorbar(hbin):
+    cbar = plt.colorbar(hbin, ax=hbin.axes, pad=0.02, shrink=0.75)
+    count_clevs = [-5, 0, 5, 10, 15, 20]
+    cbar.set_ticks(count_clevs)
+    cbar.ax.set_yticklabels(count_clevs, fontsize=16, rotation=90, va='center')
+    cbar.ax.set_ylabel('reflectivity [dBz]', fontsize=16)
+    return
+
+
+def plot_radar_location(settings, bmap):
+    radar_x, radar_y = bmap(settings['radar_lon'], settings['radar_lat'])
+    plt.plot(radar_x, radar_y, marker='+', markersize=20, c='orange')
+    return
+
+
+def make_flier_count_hexbin_map(settings, lats, lons, maxcount):
+    bmap, extent = set_up_basemap(settings)
+    lattice = hex_lattice(extent, gridsize=100)
+    hbin = draw_flier_count(bmap, lattice, lats, lons, maxcount)
+    add_flier_count_colorbar(settings, hbin)
+    return
+
+
+def make_radar_field_hexbin_map(settings, lats, lons, refl_nan):
+    bmap, extent = set_up_basemap(settings)
+    lattice = hex_lattice(extent, gridsize=100)
+    hbin = draw_radar_field(settings, bmap, lattice, lats, lons, refl_nan)
+    plot_radar_location(settings, bmap)
+    add_radar_colorbar(hbin)
+    return
+
+
+def set_up_frame(night, flier_lats, flier_lons, radar_lats, radar_lons, radar_refl):
+    """build the 2-panel figure with all static map layers and colorbars
+    (using one scan's fields for the colorbars), and capture it, keeping
+    the map line work and map scale labels on top of each frame's hexbins"""
+    settings = night['settings']
+    fig = plt.figure(figsize=(16, 8), dpi=300)
+    ax_fliers = fig.add_subplot(1, 2, 1)
+    bmap_fliers, extent = set_up_basemap(settings)
+    lattice = hex_lattice(extent, gridsize=100)
+    overlays = [artist for artist in ax_fliers.get_children()
+                if isinstance(artist, (Line2D, LineCollection, Text))]
+    hbin = draw_flier_count(bmap_fliers, lattice, flier_lats, flier_lons, night['maxcount'],
+                            ax=ax_fliers)
+    add_flier_count_colorbar(settings, hbin)
+    hbin.remove()
+    #
+    ax_radar = fig.add_subplot(1, 2, 2)
+    bmap_radar, _ = set_up_basemap(settings)
+    plot_radar_location(settings, bmap_radar)
+    overlays.extend([artist for artist in ax_radar.get_children()
+                     if isinstance(artist, (Line2D, LineCollection, Text))])
+    hbin = draw_radar_field(settings, bmap_radar, lattice, radar_lats, radar_lons, radar_refl,
+                            ax=ax_radar)
+    add_radar_colorbar(hbin)
+    hbin.remove()
+    #
+    plt.tight_layout()
+    frame = capture_background(fig, overlays=overlays)
+    frame.update({'bmaps': (bmap_fliers, bmap_radar), 'axes': (ax_fliers, ax_radar),
+                  'lattice': lattice})
+    return frame
+
+
+def fliers_fname(sim_date, radar_date, radar_time):
+    return '../Data/%s/Radar/%s_%s_XAM_fliers.csv' % (sim_date, radar_date, radar_time)
+
+
+def get_scans(archive, sim_date, radar_date, times):
+    """scan times (YYYYMMDDHHMM) from HHMM times on radar_date, HHMM:HHMM
+    ranges of archived scans on radar_date, or 'all' archived scans of the
+    night that have simulated flier locations"""
+    scans = list()
+    for radar_time in times:
+        if radar_time == 'all':
+            scans.extend([scan for scan in archive['times'] if
+                          os.path.exists(fliers_fname(sim_date, scan[:8], scan[8:]))])
+        elif ':' in radar_time:
+            time1, time2 = [str(hhmm).zfill(4) for hhmm in radar_time.split(':')]
+            scans.extend([scan for scan in archive['times'] if
+                          (scan[:8] == radar_date) and (time1 <= scan[8:] <= time2) and
+                          os.path.exists(fliers_fname(sim_date, scan[:8], scan[8:]))])
+        else:
+            scans.append('%s%s' % (radar_date, str(radar_time).zfill(4)))
+    return sorted(set(scans))
+
+
+def plot_scan(night, scan, use_background=False):
+    """plot simulated flier count and radar reflectivity for one scan time"""
+    settings = night['settings']
+    radar_date, radar_time = scan[:8], scan[8:]
+    infname = fliers_fname(night['sim_date'], radar_date, radar_time)
+    print('reading %s' % infname.split('/')[-1])
+    flier_lats, flier_lons = get_flier_locations(infname)
+    print('reading radar scan %s' % scan)
+    archive = open_radar_archive(night['archive_dir'])
+    radar_lats, radar_lons, radar_refl = get_radar_field(settings, archive, scan)
+    fname = '%s_%s_XAM_fliers_+_radar.png' % (radar_date, radar_time)
+    #
+    if use_background:
+        key = (settings['name'], night['sim_date'], night['maxcount'])
+        if key not in frames:
+            print('rendering static map background')
+            frames[key] = set_up_frame(night, flier_lats, flier_lons, radar_lats, radar_lons,
+                                       radar_refl)
+        frame = frames[key]
+        bmap_fliers, bmap_radar = frame['bmaps']
+        ax_fliers, ax_radar = frame['axes']
+        artists = [draw_flier_count(bmap_fliers, frame['lattice'], flier_lats, flier_lons,
+                                    night['maxcount'], ax=ax_fliers),
+                   draw_radar_field(settings, bmap_radar, frame['lattice'], radar_lats,
+                                    radar_lons, radar_refl, ax=ax_radar)]
+        save_frame(frame, artists, fname)
+        return
+    #
+    fig = plt.figure(figsize=(16, 8))
+    print('plotting flier count')
+    fig.add_subplot(1, 2, 1)
+    make_flier_count_hexbin_map(settings, flier_lats, flier_lons, night['maxcount'])
+    #
+    print('plotting corresponding radar field')
+    fig.add_subplot(1, 2, 2)
+    make_radar_field_hexbin_map(settings, radar_lats, radar_lons, radar_refl)
+    #
+    plt.tight_layout()
+    plt.savefig(fname, dpi=300, bbox_inches='tight')
+    print('- saved %s' % fname)
+    plt.close()
+    return
+
+
+def plot_scans(night, scans, use_background=False, workers=1):
+    """plot every scan time, serially or on a pool of worker processes"""
+    run_jobs(partial(plot_scan, night), [(scan, use_background) for scan in scans], workers)
+    return
+
+
+def score_scans(night, scans):
+    """bin simulated fliers and radar reflectivity for every scan onto one
+    hex lattice and write their agreement statistics to a CSV file"""
+    settings = night['settings']
+    bmap = get_basemap(settings['bottom_lat'], settings['top_lat'],
+                       settings['left_lon'], settings['right_lon'])
+    lattice = hex_lattice(map_extent(settings, bmap), gridsize=100)
+    nscans = len(scans)
+    #
+    print('binning simulated flier locations')
+    flier_dfs = read_csv_files([fliers_fname(night['sim_date'], scan[:8], scan[8:])
+                                for scan in scans],
+                               {'lat': np.float64, 'lon': np.float64}, index_col=None)
+    scan_idxs = np.repeat(np.arange(nscans), [len(flier_df) for flier_df in flier_dfs])
+    flier_df = pd.concat(flier_dfs, ignore_index=True)
+    x, y = bmap(np.array(flier_df['lon']), np.array(flier_df['lat']))
+    flier_counts = accumulate_hexbin_stack(lattice, x, y, scan_idxs, nscans)['count']
+    #
+    print('binning radar reflectivity')
+    archive = open_radar_archive(night['archive_dir'])
+    rows = [archive['times'].get_loc(scan) for scan in scans]
+    refl = np.array(archive['reflectivity'][rows])
+    refl = np.where((refl < settings['dBz_min']) | (refl > settings['dBz_max']), np.nan, refl)
+    x, y = bmap(np.array(archive['points']['longitude']),
+                np.array(archive['points']['latitude']))
+    scan_idxs = np.repeat(np.arange(nscans), len(x))
+    totals = accumulate_hexbin_stack(lattice, np.tile(x, nscans), np.tile(y, nscans),
+                                     scan_idxs, nscans, C=refl.ravel())
+    radar_means = hexbin_values(totals, 'mean')
+    #
+    metrics = agreement_metrics(lattice['centers'], flier_counts, radar_means)
+    metrics.insert(0, 'scan_time', scans)
+    fname = '%s_XAM_fliers_+_radar_agreement.csv' % night['sim_date']
+    metrics.to_csv(fname, index=False, float_format='%.4f')
+    print('- saved %s' % fname)
+    return
+
+# end flier_radar_maps.py
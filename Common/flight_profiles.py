@@ -0,0 +1,95 @@
+"""
+Python module "flight_profiles.py"
+by Matthew Garcia, Post-doctoral Research Associate
+Dept. of Forest and Wildlife Ecology
+University of Wisconsin - Madison
+matt.e.garcia@gmail.com
+
+Copyright (C) 2021 by Matthew Garcia
+
+Flight profiles and per-flight summary statistics for a whole replicate at
+once. The samples of every flier from takeoff through landing are gathered
+from the trajectory store's columns with one index array (date_time is
+already parsed there, in one vectorized call, to integer UTC seconds), so
+elapsed flight minutes are float arrays that run correctly across day
+boundaries. Duration, altitude, temperature and displacement of every
+flight are computed with reductions over the flight offsets, so flights can
+be selected from the whole population by criteria.
+"""
+
+
+import numpy as np
+import pandas as pd
+from trajectory_store import get_column
+
+
+profile_names = ['date_time', 'lat', 'lon', 'alt_MSL', 'sfc_elev', 'T']
+
+
+def flight_profiles(store, names=None):
+    """column arrays of every flier's samples from takeoff through landing,
+    concatenated, with the flier table rows, offsets and elapsed minutes"""
+    if names is None:
+        names = [name for name in profile_names if name in store['names']]
+    fliers = store['fliers']
+    flown = np.asarray(fliers['takeoff']) >= 0
+    starts = np.asarray(fliers['offset'] + fliers['takeoff'])[flown]
+    # fliers still airborne at the end have their landing index past their samples
+    last = np.minimum(fliers['landing'], fliers['length'] - 1)
+    lengths = np.asarray(last - fliers['takeoff'] + 1)[flown]
+    offsets = np.cumsum(lengths) - lengths
+    idxs = np.arange(np.sum(lengths)) - np.repeat(offsets, lengths) + \
+        np.repeat(starts, lengths)
+    profiles = {name: np.asarray(get_column(store, name)[idxs]) for name in names}
+    profiles['fliers'] = fliers.index[flown]
+    profiles['offsets'] = offsets
+    profiles['lengths'] = lengths
+    if 'date_time' in profiles:
+        date_time = profiles['date_time']
+        profiles['elapsed'] = (date_time - np.repeat(date_time[offsets], lengths)) / 60.0
+    return profiles
+
+
+def great_circle_km(lat1, lon1, lat2, lon2):
+    """great-circle distance [km] between pairs of lat/lon points"""
+    lat1, lon1, lat2, lon2 = [np.radians(np.asarray(v, dtype=float))
+                              for v in (lat1, lon1, lat2, lon2)]
+    a = np.sin((lat2 - lat1) / 2.0) ** 2 + \
+        np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2.0) ** 2
+    return 2.0 * 6371.0 * np.arcsin(np.sqrt(a))
+
+
+def flight_summaries(profiles):
+    """per-flight summary statistics, indexed by flier"""
+    offsets = profiles['offsets']
+    ends = offsets + profiles['lengths'] - 1
+    summary = pd.DataFrame(index=profiles['fliers'])
+    summary['npts'] = profiles['lengths']
+    if len(offsets) == 0:
+        return summary
+    if 'elapsed' in profiles:
+        summary['takeoff_time'] = pd.to_datetime(profiles['date_time'][offsets], unit='s')
+        summary['duration'] = profiles['elapsed'][ends]
+    if 'alt_MSL' in profiles:
+        summary['max_alt'] = np.maximum.reduceat(profiles['alt_MSL'], offsets)
+        if 'sfc_elev' in profiles:
+            alt_AGL = profiles['alt_MSL'] - profiles['sfc_elev']
+            summary['max_alt_AGL'] = np.maximum.reduceat(alt_AGL, offsets)
+    if 'T' in profiles:
+        summary['mean_T'] = np.add.reduceat(profiles['T'].astype(np.float64), offsets) / \
+            profiles['lengths']
+        summary['min_T'] = np.minimum.reduceat(profiles['T'], offsets)
+    if 'lat' in profiles:
+        lats, lons = profiles['lat'], profiles['lon']
+        summary['distance'] = great_circle_km(lats[offsets], lons[offsets],
+                                              lats[ends], lons[ends])
+    return summary
+
+
+def get_profile(profiles, flier, names):
+    """dict of profile arrays for one flier's flight"""
+    pos = profiles['fliers'].get_loc(flier)
+    offset, length = profiles['offsets'][pos], profiles['lengths'][pos]
+    return {name: profiles[name][offset:offset+length] for name in names}
+
+# end flight_profiles.py
@@ -0,0 +1,83 @@
+"""
+Python module "flight_segments.py"
+by Matthew Garcia, Post-doctoral Research Associate
+Dept. of Forest and Wildlife Ecology
+University of Wisconsin - Madison
+matt.e.garcia@gmail.com
+
+Copyright (C) 2021 by Matthew Garcia
+
+Vectorized takeoff/landing detection for a whole flier population at once.
+Samples of all fliers are concatenated into one airborne mask, with each
+flier's first sample given by an offsets array. Indices returned here are
+relative to each flier's own first sample. A takeoff index is the last
+ground sample before an airborne run (or the first airborne sample, if
+the flier starts in the air) and a landing index is the first ground
+sample after it (equal to the flier's length if it is still in the air).
+"""
+
+
+import numpy as np
+import pandas as pd
+
+
+def flier_bounds(offsets, nsamples):
+    """end (exclusive) of each flier's samples"""
+    offsets = np.asarray(offsets, dtype=np.int64)
+    return np.append(offsets[1:], nsamples)
+
+
+def flight_span(airborne, offsets):
+    """takeoff before the first flight and landing after the last flight
+    for every flier, both -1 for fliers that never leave the ground"""
+    airborne = np.asarray(airborne, dtype=bool)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    ends = flier_bounds(offsets, len(airborne))
+    takeoff = np.full(len(offsets), -1, dtype=np.int64)
+    landing = np.full(len(offsets), -1, dtype=np.int64)
+    nonempty = ends > offsets
+    if not np.any(nonempty) or not len(airborne):
+        return takeoff, landing
+    #
+    # first/last airborne sample of each flier, from one reduction over
+    # the whole population (empty fliers would repeat their neighbor's
+    # sample in reduceat, so they are left out)
+    idxs = np.arange(len(airborne), dtype=np.int64)
+    starts = offsets[nonempty]
+    first = np.minimum.reduceat(np.where(airborne, idxs, len(airborne)), starts)
+    last = np.maximum.reduceat(np.where(airborne, idxs, -1), starts)
+    flew = last >= 0
+    cols = np.flatnonzero(nonempty)[flew]
+    takeoff[cols] = np.maximum(first[flew] - 1, starts[flew]) - starts[flew]
+    landing[cols] = last[flew] + 1 - starts[flew]
+    return takeoff, landing
+
+
+def flight_segments(airborne, offsets):
+    """every separate flight (contiguous airborne run) of every flier, as a
+    table of flier position, flight number, takeoff and landing indices"""
+    airborne = np.asarray(airborne, dtype=bool)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    ends = flier_bounds(offsets, len(airborne))
+    #
+    # runs begin where the previous sample is on the ground or belongs to
+    # another flier, and finish where the next one is
+    first_sample = np.zeros(len(airborne), dtype=bool)
+    first_sample[offsets[ends > offsets]] = True
+    last_sample = np.zeros(len(airborne), dtype=bool)
+    last_sample[ends[ends > offsets] - 1] = True
+    prev_airborne = np.append(False, airborne[:-1]) & ~first_sample
+    next_airborne = np.append(airborne[1:], False) & ~last_sample
+    run_starts = np.flatnonzero(airborne & ~prev_airborne)
+    run_ends = np.flatnonzero(airborne & ~next_airborne)
+    #
+    fliers = np.searchsorted(offsets, run_starts, side='right') - 1
+    flier_starts = offsets[fliers]
+    nflight = np.arange(len(run_starts)) - np.searchsorted(fliers, fliers, side='left')
+    segments = pd.DataFrame({'flier_pos': fliers,
+                             'flight': nflight,
+                             'takeoff': np.maximum(run_starts - 1, flier_starts) - flier_starts,
+                             'landing': run_ends + 1 - flier_starts})
+    return segments
+
+# end flight_segments.py
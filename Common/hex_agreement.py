@@ -0,0 +1,72 @@
+"""
+Python module "hex_agreement.py"
+by Matthew Garcia, Post-doctoral Research Associate
+Dept. of Forest and Wildlife Ecology
+University of Wisconsin - Madison
+matt.e.garcia@gmail.com
+
+Copyright (C) 2021 by Matthew Garcia
+
+Spatial agreement between simulated flier counts and radar reflectivity
+binned on the same hexagon lattice, for many scan times at once. Both
+fields are (time x cell) arrays: flier counts per cell (zero where there
+are none) and mean reflectivity per cell in dBZ (NaN where there is no
+echo). For every scan time this gives the Pearson correlation of flier
+counts with reflectivity over the cells with echo, the distance between
+the flier-count centroid and the reflectivity centroid (weighted by
+linear reflectivity Z), and the overlap (intersection over union) of
+the cells occupied by fliers and the cells with echo.
+"""
+
+
+import numpy as np
+import pandas as pd
+
+
+def weighted_centroids(centers, weights):
+    """(time, 2) centroids of cell centers, NaN for all-zero weights"""
+    total = weights.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (weights @ centers) / total[:, np.newaxis]
+
+
+def agreement_metrics(centers, fliers, radar):
+    """DataFrame of per-scan agreement statistics from (time x cell) flier
+    count and radar reflectivity arrays on cells with the given centers"""
+    fliers = np.asarray(fliers, dtype=float)
+    radar = np.asarray(radar, dtype=float)
+    echo = np.isfinite(radar)
+    occupied = fliers > 0
+    #
+    # Pearson correlation over cells with echo
+    n_echo = echo.sum(axis=1)
+    F = np.where(echo, fliers, 0.0)
+    R = np.where(echo, radar, 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        F_mean = F.sum(axis=1) / n_echo
+        R_mean = R.sum(axis=1) / n_echo
+        F_anom = np.where(echo, F - F_mean[:, np.newaxis], 0.0)
+        R_anom = np.where(echo, R - R_mean[:, np.newaxis], 0.0)
+        correlation = (F_anom * R_anom).sum(axis=1) / \
+            np.sqrt((F_anom ** 2).sum(axis=1) * (R_anom ** 2).sum(axis=1))
+    #
+    # centroid displacement, with reflectivity weighted as linear Z
+    flier_xy = weighted_centroids(centers, fliers)
+    radar_xy = weighted_centroids(centers, np.where(echo, 10.0 ** (R / 10.0), 0.0))
+    displacement = np.hypot(*(flier_xy - radar_xy).T)
+    #
+    # overlap (intersection over union) of occupied and echo cells
+    n_both = (occupied & echo).sum(axis=1)
+    n_either = (occupied | echo).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        overlap = n_both / n_either
+    #
+    metrics = pd.DataFrame({'n_fliers': fliers.sum(axis=1).astype(int),
+                            'n_flier_cells': occupied.sum(axis=1),
+                            'n_echo_cells': n_echo,
+                            'correlation': correlation,
+                            'centroid_displacement_km': displacement / 1000.0,
+                            'overlap_fraction': overlap})
+    return metrics
+
+# end hex_agreement.py
@@ -0,0 +1,170 @@
+"""
+Python module "hex_bins.py"
+by Matthew Garcia, Post-doctoral Research Associate
+Dept. of Forest and Wildlife Ecology
+University of Wisconsin - Madison
+matt.e.garcia@gmail.com
+
+Copyright (C) 2021 by Matthew Garcia
+
+Hexagonal binning on the same lattice that matplotlib's hexbin() uses for a
+given extent and gridsize, but with per-hexagon counts and sums kept as
+plain arrays and accumulated with np.bincount, so that points can be
+binned a chunk at a time (e.g. one output file at a time) and drawn once
+all chunks have been added. Binned totals can be reduced to counts, sums
+or means, saved, reloaded and merged (e.g. across replicates) without
+re-binning the points, so aggregation and plotting are separate steps.
+"""
+
+
+import numpy as np
+import matplotlib as mpl
+import matplotlib.pyplot as plt
+from matplotlib.collections import PolyCollection
+
+
+def hex_lattice(extent, gridsize=100):
+    """hexagon lattice geometry for an (xmin, xmax, ymin, ymax) extent"""
+    xmin, xmax, ymin, ymax = extent
+    nx = gridsize
+    ny = int(nx / np.sqrt(3))
+    padding = 1.e-9 * (xmax - xmin)
+    xmin -= padding
+    xmax += padding
+    sx = (xmax - xmin) / nx
+    sy = (ymax - ymin) / ny
+    #
+    # two interleaved rectangular grids of hexagon centers, the first on
+    # whole and the second on half index coordinates
+    nx1, ny1 = nx + 1, ny + 1
+    centers = np.zeros((nx1 * ny1 + nx * ny, 2))
+    centers[:nx1 * ny1, 0] = np.repeat(np.arange(nx1), ny1)
+    centers[:nx1 * ny1, 1] = np.tile(np.arange(ny1), nx1)
+    centers[nx1 * ny1:, 0] = np.repeat(np.arange(nx) + 0.5, ny)
+    centers[nx1 * ny1:, 1] = np.tile(np.arange(ny), nx) + 0.5
+    centers *= [sx, sy]
+    centers += [xmin, ymin]
+    return {'bounds': tuple(extent), 'extent': (xmin, xmax, ymin, ymax),
+            'gridsize': gridsize, 'nx': nx, 'ny': ny, 'sx': sx, 'sy': sy,
+            'centers': centers}
+
+
+def hex_cells(lattice, x, y):
+    """lattice cell index of each point, -1 for points outside the extent"""
+    xmin, _, ymin, _ = lattice['extent']
+    nx, ny = lattice['nx'], lattice['ny']
+    nx1, ny1 = nx + 1, ny + 1
+    ix = (np.asarray(x, dtype=float) - xmin) / lattice['sx']
+    iy = (np.asarray(y, dtype=float) - ymin) / lattice['sy']
+    ix1 = np.round(ix).astype(int)
+    iy1 = np.round(iy).astype(int)
+    ix2 = np.floor(ix).astype(int)
+    iy2 = np.floor(iy).astype(int)
+    i1 = np.where((0 <= ix1) & (ix1 < nx1) & (0 <= iy1) & (iy1 < ny1),
+                  ix1 * ny1 + iy1, -1)
+    i2 = np.where((0 <= ix2) & (ix2 < nx) & (0 <= iy2) & (iy2 < ny),
+                  nx1 * ny1 + ix2 * ny + iy2, -1)
+    d1 = (ix - ix1) ** 2 + 3.0 * (iy - iy1) ** 2
+    d2 = (ix - ix2 - 0.5) ** 2 + 3.0 * (iy - iy2 - 0.5) ** 2
+    return np.where(d1 < d2, i1, i2)
+
+
+def accumulate_hexbin(lattice, x, y, C=None, totals=None):
+    """add points (and optional values C) to per-hexagon count and sum
+    arrays, starting new arrays if totals is None; as in hexbin(), points
+    with non-finite coordinates or values are left out"""
+    ncells = len(lattice['centers'])
+    if totals is None:
+        totals = {'count': np.zeros(ncells, dtype=np.int64),
+                  'sum': np.zeros(ncells, dtype=np.float64)}
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    finite = np.isfinite(x) & np.isfinite(y)
+    if C is not None:
+        C = np.asarray(C, dtype=float)
+        finite &= np.isfinite(C)
+    cells = hex_cells(lattice, x[finite], y[finite])
+    inside = cells >= 0
+    totals['count'] += np.bincount(cells[inside], minlength=ncells)
+    if C is not None:
+        totals['sum'] += np.bincount(cells[inside], weights=C[finite][inside],
+                                     minlength=ncells)
+    return totals
+
+
+def accumulate_hexbin_stack(lattice, x, y, groups, ngroups, C=None):
+    """per-group (e.g. per-scan) count and sum arrays, shape (ngroups, ncells),
+    binning the points of every group in one np.bincount pass"""
+    ncells = len(lattice['centers'])
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    finite = np.isfinite(x) & np.isfinite(y)
+    if C is not None:
+        C = np.asarray(C, dtype=float)
+        finite &= np.isfinite(C)
+    cells = hex_cells(lattice, x[finite], y[finite])
+    inside = cells >= 0
+    idxs = np.asarray(groups)[finite][inside] * ncells + cells[inside]
+    totals = {'count': np.bincount(idxs, minlength=ngroups*ncells).reshape(ngroups, ncells),
+              'sum': np.zeros((ngroups, ncells))}
+    if C is not None:
+        totals['sum'] = np.bincount(idxs, weights=C[finite][inside],
+                                    minlength=ngroups*ncells).reshape(ngroups, ncells)
+    return totals
+
+
+def hexbin_values(totals, reduce='count', mincnt=1):
+    """per-hexagon counts, sums or means, NaN where fewer than mincnt points"""
+    count = totals['count']
+    if reduce == 'mean':
+        with np.errstate(divide='ignore', invalid='ignore'):
+            values = totals['sum'] / count
+    else:
+        values = np.asarray(totals[reduce], dtype=float).copy()
+    values[count < mincnt] = np.nan
+    return values
+
+
+def merge_hexbins(all_totals):
+    """combine totals binned separately on the same lattice"""
+    merged = {'count': np.sum([totals['count'] for totals in all_totals], axis=0),
+              'sum': np.sum([totals['sum'] for totals in all_totals], axis=0)}
+    return merged
+
+
+def save_hexbins(fname, lattice, totals):
+    """save the lattice extent/gridsize and binned totals"""
+    np.savez(fname, extent=lattice['bounds'], gridsize=lattice['gridsize'],
+             count=totals['count'], sum=totals['sum'])
+    return
+
+
+def load_hexbins(fname):
+    """load saved binned totals, returning the lattice and totals"""
+    with np.load(fname) as npz:
+        lattice = hex_lattice(tuple(npz['extent']), int(npz['gridsize']))
+        totals = {'count': npz['count'], 'sum': npz['sum']}
+    return lattice, totals
+
+
+def draw_hexbin(bmap, lattice, values, ax=None, **kwargs):
+    """draw the hexagons with non-NaN values, like bmap.hexbin()"""
+    if ax is None:
+        ax = plt.gca()
+    good = ~np.isnan(values)
+    hexagon = [lattice['sx'], lattice['sy'] / 3] * np.array(
+        [[.5, -.5], [.5, .5], [0., 1.], [-.5, .5], [-.5, -.5], [0., -1.]])
+    vmin = kwargs.pop('vmin', None)
+    vmax = kwargs.pop('vmax', None)
+    kwargs.setdefault('edgecolors', 'face')
+    kwargs.setdefault('linewidths', mpl.rcParams['patch.linewidth'])
+    collection = PolyCollection(lattice['centers'][good, np.newaxis, :] + hexagon, **kwargs)
+    collection.set_array(values[good])
+    collection.set_clim(vmin, vmax)
+    ax.add_collection(collection, autolim=False)
+    plt.sca(ax)
+    plt.sci(collection)
+    bmap.set_axes_limits(ax=ax)
+    return collection
+
+# end hex_bins.py
@@ -0,0 +1,81 @@
+"""
+Python module "histogram_plots.py"
+by Matthew Garcia, Post-doctoral Research Associate
+Dept. of Forest and Wildlife Ecology
+University of Wisconsin - Madison
+matt.e.garcia@gmail.com
+
+Copyright (C) 2021 by Matthew Garcia
+
+Combined female/male flight histogram plots for the Fig_11 scripts. The
+histograms of each selected night (from its combined file or from selected
+replicates, see histogram_sums.py) are drawn as fractions of all of that
+night's fliers, one pair of line styles per night, on one set of axes. The
+scripts differ only in their histogram name and axis settings: which axis
+holds the bins, and the figure size, limits, ticks and labels.
+"""
+
+
+import numpy as np
+import matplotlib.pyplot as plt
+from parallel_jobs import parse_workers
+from replicates import parse_replicates
+from histogram_sums import night_histograms, night_label
+
+
+# (female, male) line styles for each night, in order
+line_styles = [('solid', 'dotted'), ('dashed', 'dashdot'),
+               ((0, (5, 1)), (0, (1, 1))), ((0, (3, 1, 1, 1)), (0, (5, 5)))]
+
+
+def plot_night_histograms(ax, hist_name, sim_dates, bins_axis, replicates=None, workers=1):
+    """plot female and male fractions of all fliers in each histogram bin for
+    each night, with the bins on the x or y axis"""
+    for i, sim_date in enumerate(sim_dates):
+        path = '../Data/%s/pyATM' % sim_date
+        hists = night_histograms(path, sim_date, hist_name, replicates, workers)
+        bins = hists['overall']['bins']
+        nfliers = np.sum(hists['overall']['counts'])
+        for sex, color, style in zip(['female', 'male'], ['r', 'b'],
+                                     line_styles[i % len(line_styles)]):
+            fractions = hists[sex]['counts'] / nfliers
+            if bins_axis == 'y':
+                ax.plot(fractions, bins, color, linestyle=style,
+                        label='%s %ss' % (night_label(sim_date), sex))
+            else:
+                ax.plot(bins, fractions, color, linestyle=style,
+                        label='%s %ss' % (night_label(sim_date), sex))
+    return
+
+
+def plot_combined_histograms(args, hist_name, settings):
+    """plot the combined histograms of the nights given in the command-line
+    arguments (default 20130714 20130715), with --replicates and --workers
+    options, and save the figure"""
+    print()
+    args, workers = parse_workers(list(args))
+    args, replicates = parse_replicates(args)
+    sim_dates = args if args else ['20130714', '20130715']
+    #
+    fig = plt.figure(figsize=settings['figsize'])
+    ax1 = fig.add_subplot(111)
+    plot_night_histograms(ax1, hist_name, sim_dates, settings['bins_axis'], replicates, workers)
+    #
+    plt.legend(loc='upper right', fontsize=14)
+    plt.xlim(settings['xlim'])
+    plt.ylim(settings['ylim'])
+    ax1.set_xticks(settings['xticks'])
+    ax1.set_xticklabels(settings['xticks'], fontsize=16)
+    plt.xlabel(settings['xlabel'], fontsize=16)
+    ax1.set_yticks(settings['yticks'])
+    ax1.set_yticklabels(settings['yticks'], fontsize=16, rotation='vertical', va='center')
+    plt.ylabel(settings['ylabel'], fontsize=16)
+    #
+    plt.tight_layout()
+    fname = '%s_combined_histograms.png' % hist_name
+    plt.savefig(fname, dpi=300, bbox_inches='tight')
+    print('saved figure %s' % fname)
+    plt.close()
+    return
+
+# end histogram_plots.py
@@ -0,0 +1,105 @@
+"""
+Python module "histogram_sums.py"
+by Matthew Garcia, Post-doctoral Research Associate
+Dept. of Forest and Wildlife Ecology
+University of Wisconsin - Madison
+matt.e.garcia@gmail.com
+
+Copyright (C) 2021 by Matthew Garcia
+
+Mergeable partial sums of pyATM flight histogram files. Each
+default_flight_*_histogram.csv file has one column per bin, so a file
+reduces to its bin values and column sums (with row and file counts), and
+any number of these partial sums (e.g. from hundreds of replicate
+simulations, or from several nights) are merged just by adding them.
+Files are reduced in parallel, each worker process summing its own share
+of the files, so that only the small partial sums are passed back.
+"""
+
+
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from parallel_jobs import run_jobs
+from replicates import replicate_nums
+
+
+def replicate_fnames(path, sim_date, fname, replicates=None):
+    """histogram files for a night: the combined file in the pyATM output
+    path if replicates is None, otherwise the selected replicates' files in
+    their simulation summary directories"""
+    if replicates is None:
+        return ['%s/%s' % (path, fname)]
+    summary_path = '%s/WRF-NARR_d03_%s_simulation_%%s_summary/%s' % (path, sim_date, fname)
+    return [summary_path % rep_num for rep_num in replicate_nums(replicates, summary_path)]
+
+
+def histogram_sums(fname):
+    """partial sums of one histogram file"""
+    hist_df = pd.read_csv(fname, index_col=False, dtype=np.float64)
+    partial = {'bins': np.array(hist_df.columns).astype(int),
+               'counts': np.nansum(hist_df.to_numpy(), axis=0),
+               'nrows': len(hist_df),
+               'nfiles': 1}
+    return partial
+
+
+def merge_histograms(partials):
+    """add partial sums of histograms with the same bins"""
+    partials = list(partials)
+    bins = partials[0]['bins']
+    for partial in partials[1:]:
+        if not np.array_equal(partial['bins'], bins):
+            raise ValueError('cannot merge histograms with different bins')
+    merged = {'bins': bins,
+              'counts': np.sum([partial['counts'] for partial in partials], axis=0),
+              'nrows': sum(partial['nrows'] for partial in partials),
+              'nfiles': sum(partial['nfiles'] for partial in partials)}
+    return merged
+
+
+def sum_histogram_files(fnames):
+    """partial sums of a list of histogram files, one file at a time"""
+    return merge_histograms(histogram_sums(fname) for fname in fnames)
+
+
+def reduce_histogram_sets(fname_sets, workers=1):
+    """merged sums for each of several named lists of histogram files,
+    with each list split into (up to) one share of files per worker"""
+    jobs = list()
+    names = list()
+    for name, fnames in fname_sets.items():
+        if len(fnames) == 0:
+            raise ValueError('no histogram files for %s' % name)
+        for share in np.array_split(np.array(fnames), min(workers, len(fnames))):
+            jobs.append((list(share),))
+            names.append(name)
+    partials = run_jobs(sum_histogram_files, jobs, workers)
+    merged = dict()
+    for name in fname_sets:
+        merged[name] = merge_histograms(partial for job_name, partial in
+                                        zip(names, partials) if job_name == name)
+    return merged
+
+
+def night_histograms(path, sim_date, hist_name, replicates=None, workers=1):
+    """merged overall, female and male histograms of one night's simulation
+    (e.g. hist_name 'default_flight_alt')"""
+    fname_sets = dict()
+    for group, suffix in [('overall', ''), ('female', '_female'), ('male', '_male')]:
+        fname_sets[group] = replicate_fnames(path, sim_date, '%s%s_histogram.csv' %
+                                             (hist_name, suffix), replicates)
+    print('reducing %d %s histogram files for %s' %
+          (len(fname_sets['overall']), hist_name, sim_date))
+    return reduce_histogram_sets(fname_sets, workers)
+
+
+def night_label(sim_date):
+    """legend label for the night starting on sim_date, e.g. '14-15 July'"""
+    start = datetime.strptime(sim_date, '%Y%m%d')
+    end = start + timedelta(days=1)
+    if start.month == end.month:
+        return '%d-%d %s' % (start.day, end.day, start.strftime('%B'))
+    return '%d %s-%d %s' % (start.day, start.strftime('%B'), end.day, end.strftime('%B'))
+
+# end histogram_sums.py
@@ -0,0 +1,136 @@
+"""
+Python module "map_background.py"
+by Matthew Garcia, Post-doctoral Research Associate
+Dept. of Forest and Wildlife Ecology
+University of Wisconsin - Madison
+matt.e.garcia@gmail.com
+
+Copyright (C) 2021 by Matthew Garcia
+
+Pre-rendered static background layers for animation frames. A figure is
+set up once with everything that does not change between frames (map
+outlines, parallels/meridians, topography, colorbars), rendered a single
+time, and its RGBA canvas is kept in memory. Each frame then restores that
+buffer, draws only its own artists on top (trajectories, contours, barbs,
+titles), blends any static line work that must stay on top, and writes
+the canvas directly, cropped the same way as savefig(..., bbox_inches='tight').
+For content that only grows (e.g. trajectories), frames can instead be
+accumulated on the retained canvas, drawing only each frame's additions.
+"""
+
+
+import numpy as np
+import matplotlib.image as mpimg
+from matplotlib.transforms import Bbox
+
+
+def tight_crop(fig, pad_inches=0.1):
+    """pixel rows/columns of the canvas covered by savefig's tight bbox"""
+    renderer = fig.canvas.get_renderer()
+    bbox = fig.get_tightbbox(renderer).padded(pad_inches)
+    height = int(round(fig.bbox.height))
+    width = int(round(fig.bbox.width))
+    col1 = max(0, int(np.floor(bbox.x0 * fig.dpi)))
+    col2 = min(width, int(np.ceil(bbox.x1 * fig.dpi)))
+    row1 = max(0, height - int(np.ceil(bbox.y1 * fig.dpi)))
+    row2 = min(height, height - int(np.floor(bbox.y0 * fig.dpi)))
+    return row1, row2, col1, col2
+
+
+def capture_background(fig, titles=(), overlays=()):
+    """render a figure's static content once and keep it for later frames
+
+    titles are the figure's Text artists that change with each frame; they
+    should hold representative text so that the crop region includes them,
+    and are blanked in the stored background. overlays are static artists
+    that must stay on top of each frame's artists (e.g. coastlines over
+    filled contours); they are rendered separately onto a transparent layer
+    and blended over every frame.
+    """
+    fig.canvas.draw()
+    crop = tight_crop(fig)
+    texts = [title.get_text() for title in titles]
+    for title in titles:
+        title.set_text('')
+    for artist in overlays:
+        artist.set_visible(False)
+    fig.canvas.draw()
+    background = fig.canvas.copy_from_bbox(fig.bbox)
+    title_regions = list()
+    for title, text in zip(titles, texts):
+        title.set_text(text)
+        extent = title.get_window_extent(fig.canvas.get_renderer())
+        band = Bbox.from_extents(0, extent.y0 - 2, fig.bbox.width, extent.y1 + 2)
+        title_regions.append(fig.canvas.copy_from_bbox(band))
+        title.set_text('')
+    #
+    # render the overlay artists alone on a transparent canvas
+    overlay = None
+    if overlays:
+        renderer = fig.canvas.get_renderer()
+        renderer.clear()
+        for artist in overlays:
+            artist.set_visible(True)
+            fig.draw_artist(artist)
+        row1, row2, col1, col2 = crop
+        layer = np.array(fig.canvas.buffer_rgba())[row1:row2, col1:col2]
+        rows, cols = np.nonzero(layer[:, :, 3])
+        alpha = layer[rows, cols, 3:4].astype(np.float32) / 255.0
+        overlay = (rows, cols, layer[rows, cols, :3].astype(np.float32), alpha)
+        fig.canvas.restore_region(background)
+    for title, text in zip(titles, texts):
+        title.set_text(text)
+    return {'fig': fig, 'background': background, 'crop': crop,
+            'titles': list(titles), 'title_regions': title_regions,
+            'overlay': overlay}
+
+
+def write_frame_image(frame, fname):
+    """crop the current canvas, blend the static overlay layer on top, and
+    save it as an image file"""
+    fig = frame['fig']
+    row1, row2, col1, col2 = frame['crop']
+    image = np.array(fig.canvas.buffer_rgba())[row1:row2, col1:col2]
+    if frame['overlay'] is not None:
+        rows, cols, rgb, alpha = frame['overlay']
+        under = image[rows, cols, :3].astype(np.float32)
+        image[rows, cols, :3] = np.round(rgb * alpha + under * (1.0 - alpha)).astype(np.uint8)
+    mpimg.imsave(fname, image, dpi=fig.dpi)
+    print('- saved %s' % fname)
+    return
+
+
+def save_frame(frame, artists, fname, remove=True):
+    """draw artists and current titles over the stored background, blend the
+    static overlay layer on top, save the frame image, and (by default)
+    remove the artists from the figure"""
+    fig = frame['fig']
+    fig.canvas.restore_region(frame['background'])
+    for artist in list(artists) + frame['titles']:
+        fig.draw_artist(artist)
+    write_frame_image(frame, fname)
+    if remove:
+        for artist in artists:
+            artist.remove()
+    return
+
+
+def add_to_frame(frame, artists):
+    """draw artists onto the retained canvas without restoring the background,
+    so that content accumulates from one frame to the next"""
+    for artist in artists:
+        frame['fig'].draw_artist(artist)
+    return
+
+
+def save_current_frame(frame, fname):
+    """redraw the current titles over the retained canvas and save the frame"""
+    fig = frame['fig']
+    for region in frame['title_regions']:
+        fig.canvas.restore_region(region)
+    for title in frame['titles']:
+        fig.draw_artist(title)
+    write_frame_image(frame, fname)
+    return
+
+# end map_background.py
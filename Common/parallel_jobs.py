@@ -0,0 +1,60 @@
+"""
+Python module "parallel_jobs.py"
+by Matthew Garcia, Post-doctoral Research Associate
+Dept. of Forest and Wildlife Ecology
+University of Wisconsin - Madison
+matt.e.garcia@gmail.com
+
+Copyright (C) 2021 by Matthew Garcia
+
+Spread independent per-file jobs (e.g. hourly WRF map frames) across a
+process pool. Output file names are determined by each job's inputs, so
+results do not depend on scheduling order.
+"""
+
+
+import os
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+
+def parse_workers(args):
+    """remove a '--workers N' option from command-line arguments,
+    returning the remaining arguments and the number of workers"""
+    args = list(args)
+    workers = 1
+    if '--workers' in args:
+        idx = args.index('--workers')
+        workers = max(1, int(args[idx+1]))
+        del args[idx:idx+2]
+    return args, workers
+
+
+def run_job(func, job):
+    """run one job in a worker, returning its process ID and result"""
+    return os.getpid(), func(*job)
+
+
+def run_jobs(func, jobs, workers=1):
+    """call func(*job) for each job tuple, serially or across a pool of
+    worker processes; results are returned in job order"""
+    jobs = list(jobs)
+    njobs = len(jobs)
+    if (workers <= 1) or (njobs <= 1):
+        return [func(*job) for job in jobs]
+    workers = min(workers, njobs)
+    print('running %d jobs on %d worker processes' % (njobs, workers))
+    results = [None] * njobs
+    done_by_worker = dict()
+    with ProcessPoolExecutor(max_workers=workers,
+                             mp_context=mp.get_context('fork')) as pool:
+        futures = {pool.submit(run_job, func, job): i for i, job in enumerate(jobs)}
+        for ndone, future in enumerate(as_completed(futures)):
+            i = futures[future]
+            pid, results[i] = future.result()
+            done_by_worker[pid] = done_by_worker.get(pid, 0) + 1
+            print('- [%d/%d] job %d finished on worker %d (%d jobs so far)' %
+                  (ndone+1, njobs, i, pid, done_by_worker[pid]))
+    return results
+
+# end parallel_jobs.py
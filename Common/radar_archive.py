@@ -0,0 +1,112 @@
+"""
+Python module "radar_archive.py"
+by Matthew Garcia, Post-doctoral Research Associate
+Dept. of Forest and Wildlife Ecology
+University of Wisconsin - Madison
+matt.e.garcia@gmail.com
+
+Copyright (C) 2021 by Matthew Garcia
+
+Memory-mapped archive of a night's XAM radar PPI reflectivity scans. The
+1-km product grid is the same for every scan, so the first time a night is
+read all of its cleaned_ref_ppi_xam_<date><time>_1km.csv files are packed
+into one (time x point) float32 reflectivity array, with one shared table
+of point coordinates and an index of scan times. The archive is kept in
+the "cache" subdirectory of the radar data directory, keyed by the names,
+sizes and modification times of the CSV files, so any scan (or any point's
+time series) can be sliced without parsing CSV files.
+"""
+
+
+import os
+import shutil
+import hashlib
+from glob import glob
+import numpy as np
+import pandas as pd
+from csv_loader import read_csv_file, iter_csv_files
+
+
+def scan_time(fname):
+    """YYYYMMDDHHMM scan time from a radar product file name"""
+    return os.path.basename(fname).split('_')[4]
+
+
+def archive_key(fnames):
+    """identify a set of radar files by their names, sizes and mtimes"""
+    sha = hashlib.sha1()
+    for fname in fnames:
+        stat = os.stat(fname)
+        sha.update(('%s|%d|%d\n' % (os.path.basename(fname), stat.st_size,
+                                    stat.st_mtime_ns)).encode())
+    return sha.hexdigest()[:12]
+
+
+def build_archive(fnames, archive_dir):
+    """pack radar scan CSV files into a (time x point) reflectivity array"""
+    columns = {'latitude': np.float64, 'longitude': np.float64, 'reflectivity': np.float32}
+    points = read_csv_file(fnames[0], columns)[['latitude', 'longitude']]
+    point_index = pd.MultiIndex.from_frame(points)
+    #
+    tmp_dir = '%s.%d.tmp' % (archive_dir, os.getpid())
+    os.makedirs(tmp_dir, exist_ok=True)
+    refl = np.lib.format.open_memmap(os.path.join(tmp_dir, 'reflectivity.npy'), mode='w+',
+                                     dtype=np.float32, shape=(len(fnames), len(points)))
+    for i, scan_df in enumerate(iter_csv_files(fnames, columns)):
+        if (len(scan_df) == len(points)) and \
+                np.array_equal(scan_df['latitude'], points['latitude']) and \
+                np.array_equal(scan_df['longitude'], points['longitude']):
+            refl[i] = scan_df['reflectivity']
+        else:
+            # scan on a different point set: align to the shared points
+            scan_index = pd.MultiIndex.from_frame(scan_df[['latitude', 'longitude']])
+            cols = point_index.get_indexer(scan_index)
+            if np.any(cols < 0):
+                print('- %s: %d points not on the shared grid are left out' %
+                      (os.path.basename(fnames[i]), np.sum(cols < 0)))
+            refl[i] = np.nan
+            refl[i, cols[cols >= 0]] = np.asarray(scan_df['reflectivity'])[cols >= 0]
+    refl.flush()
+    del refl
+    points.to_csv(os.path.join(tmp_dir, 'points.csv'), index=False)
+    pd.DataFrame({'scan_time': [scan_time(fname) for fname in fnames],
+                  'fname': [os.path.basename(fname) for fname in fnames]}).to_csv(
+                      os.path.join(tmp_dir, 'times.csv'), index=False)
+    os.replace(tmp_dir, archive_dir)
+    return
+
+
+def get_radar_archive(path, cache_dir=None):
+    """open the reflectivity archive for a night's radar data directory,
+    building it first if necessary"""
+    fnames = sorted(glob('%s/cleaned_ref_ppi_xam_*_1km.csv' % path))
+    if cache_dir is None:
+        cache_dir = os.path.join(path, 'cache')
+    archive_dir = os.path.join(cache_dir, 'xam_ppi_archive_%s' % archive_key(fnames))
+    if not os.path.exists(archive_dir):
+        print('- packing %d radar scans into %s' % (len(fnames), archive_dir))
+        for old_dir in glob(os.path.join(cache_dir, 'xam_ppi_archive_*')):
+            shutil.rmtree(old_dir, ignore_errors=True)
+        os.makedirs(cache_dir, exist_ok=True)
+        build_archive(fnames, archive_dir)
+    return open_radar_archive(archive_dir)
+
+
+def open_radar_archive(archive_dir):
+    """open an existing reflectivity archive directory (e.g. the 'path' of
+    an archive opened in another process)"""
+    times = pd.read_csv(os.path.join(archive_dir, 'times.csv'), index_col=None,
+                        dtype={'scan_time': str})
+    archive = {'path': archive_dir,
+               'points': pd.read_csv(os.path.join(archive_dir, 'points.csv'), index_col=None),
+               'times': pd.Index(times['scan_time']),
+               'reflectivity': np.load(os.path.join(archive_dir, 'reflectivity.npy'),
+                                       mmap_mode='r')}
+    return archive
+
+
+def get_radar_scan(archive, scan):
+    """reflectivity at every archive point for one YYYYMMDDHHMM scan time"""
+    return np.array(archive['reflectivity'][archive['times'].get_loc(scan)])
+
+# end radar_archive.py
@@ -0,0 +1,102 @@
+"""
+Python module "raster_warp.py"
+by Matthew Garcia, Post-doctoral Research Associate
+Dept. of Forest and Wildlife Ecology
+University of Wisconsin - Madison
+matt.e.garcia@gmail.com
+
+Copyright (C) 2021 by Matthew Garcia
+
+Nearest-cell warping of categorical lat/lon rasters onto the projected map
+canvas. The source raster cell under the center of every canvas pixel is
+found by inverse-projecting the pixel centers, once per (raster grid, map
+domain, canvas size); the resulting index is pickled to Data/cache like
+the Basemap instances. Any raster on the same grid (e.g. another survey
+year) is then warped by fancy indexing and drawn as a single image,
+instead of contouring the full lat/lon mesh.
+"""
+
+
+import os
+import hashlib
+import numpy as np
+import matplotlib.pyplot as plt
+from basemap_cache import default_cache_dir
+
+
+warp_indexes = dict()
+
+
+def canvas_shape(bmap, width):
+    """(rows, cols) of a canvas width pixels wide with the map's aspect ratio"""
+    return int(round(width * bmap.urcrnry / bmap.urcrnrx)), int(width)
+
+
+def warp_key(bmap, lats, lons, shape):
+    """identify a raster grid, map domain and canvas shape"""
+    sha = hashlib.sha1()
+    sha.update(('%r|%r|%r|%r\n' % (bmap.projparams, (bmap.urcrnrx, bmap.urcrnry),
+                                   (len(lats), len(lons)), tuple(shape))).encode())
+    sha.update(np.ascontiguousarray([lats[0], lats[-1], lons[0], lons[-1]],
+                                    dtype=np.float64).tobytes())
+    return sha.hexdigest()[:16]
+
+
+def warp_index(bmap, lats, lons, shape):
+    """flat index into a (len(lats), len(lons)) raster of the cell under
+    each canvas pixel center, -1 where the canvas is outside the raster"""
+    nrows, ncols = shape
+    x = (np.arange(ncols) + 0.5) * bmap.urcrnrx / ncols
+    y = (np.arange(nrows) + 0.5) * bmap.urcrnry / nrows
+    x, y = np.meshgrid(x, y)
+    pixel_lons, pixel_lats = bmap(x, y, inverse=True)
+    dlat = (lats[-1] - lats[0]) / (len(lats) - 1)
+    dlon = (lons[-1] - lons[0]) / (len(lons) - 1)
+    rows = np.floor((pixel_lats - lats[0]) / dlat + 0.5).astype(np.int64)
+    cols = np.floor((pixel_lons - lons[0]) / dlon + 0.5).astype(np.int64)
+    inside = (0 <= rows) & (rows < len(lats)) & (0 <= cols) & (cols < len(lons))
+    return np.where(inside, rows * len(lons) + cols, -1).astype(np.int32)
+
+
+def get_warp_index(bmap, lats, lons, shape, cache_dir=None):
+    """return the warp index for a raster grid and canvas, from memory or
+    disk if possible"""
+    key = warp_key(bmap, lats, lons, shape)
+    if key in warp_indexes:
+        return warp_indexes[key]
+    if cache_dir is None:
+        cache_dir = default_cache_dir
+    fname = os.path.join(cache_dir, 'warp_index_%s.npy' % key)
+    if os.path.exists(fname):
+        index = np.load(fname)
+    else:
+        index = warp_index(bmap, lats, lons, shape)
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_fname = '%s.%d.tmp.npy' % (fname[:-4], os.getpid())
+        np.save(tmp_fname, index)
+        os.replace(tmp_fname, fname)
+    warp_indexes[key] = index
+    return index
+
+
+def warp_classes(classes, index):
+    """canvas array of raster classes, masked outside the raster and where
+    the raster is masked"""
+    data = np.ma.getdata(classes).ravel()[index]
+    mask = (index < 0) | np.ma.getmaskarray(classes).ravel()[index]
+    return np.ma.masked_array(data, mask=mask, copy=False)
+
+
+def draw_warped(bmap, values, ax=None, **kwargs):
+    """draw a warped canvas array as one image over the map domain"""
+    if ax is None:
+        ax = plt.gca()
+    kwargs.setdefault('interpolation', 'nearest')
+    image = ax.imshow(values, origin='lower', extent=(0.0, bmap.urcrnrx, 0.0, bmap.urcrnry),
+                      **kwargs)
+    plt.sca(ax)
+    plt.sci(image)
+    bmap.set_axes_limits(ax=ax)
+    return image
+
+# end raster_warp.py
@@ -0,0 +1,77 @@
+"""
+Python module "raster_window.py"
+by Matthew Garcia, Post-doctoral Research Associate
+Dept. of Forest and Wildlife Ecology
+University of Wisconsin - Madison
+matt.e.garcia@gmail.com
+
+Copyright (C) 2021 by Matthew Garcia
+
+Windowed, decimated reading of categorical GeoTIFF rasters (e.g. aerial
+survey defoliation classes) in geographic coordinates. Only the window of
+raster cells covering a map's lat/lon extent is read, decimated by a whole
+number of cells to about the pixel density of the output figure, with
+nearest-neighbour resampling (so GDAL reads from overviews where the file
+has them) in strips of rows. Classes are kept as int8 and nodata cells as
+the masked value of a masked array, so that no full-resolution or
+floating-point copy of the raster is ever made.
+"""
+
+
+import numpy as np
+from osgeo import gdal
+
+
+nodata_class = -1
+
+
+def raster_window(gt, nrows, ncols, extent):
+    """pixel window (xoff, yoff, xsize, ysize) of a north-up raster covering
+    a (left_lon, right_lon, bottom_lat, top_lat) extent"""
+    if (gt[2] != 0.0) or (gt[4] != 0.0):
+        raise ValueError('rotated rasters are not supported')
+    left_lon, right_lon, bottom_lat, top_lat = extent
+    col0 = max(0, int(np.floor((left_lon - gt[0]) / gt[1])))
+    col1 = min(ncols, int(np.ceil((right_lon - gt[0]) / gt[1])))
+    row0 = max(0, int(np.floor((top_lat - gt[3]) / gt[5])))
+    row1 = min(nrows, int(np.ceil((bottom_lat - gt[3]) / gt[5])))
+    if (col1 <= col0) or (row1 <= row0):
+        raise ValueError('raster does not cover the map extent')
+    return col0, row0, col1 - col0, row1 - row0
+
+
+def read_raster_classes(fname, extent, out_shape=(2400, 2400), strip_rows=256):
+    """read the classes of a categorical raster over a lat/lon extent, at
+    about out_shape (rows, cols) cells; returns a dict with the int8 masked
+    class array (south row first), the 1D cell-center lats and lons, and the
+    decimation step"""
+    ds = gdal.Open(fname)
+    band = ds.GetRasterBand(1)
+    nodata = band.GetNoDataValue()
+    if nodata is None:
+        nodata = -9999.0
+    gt = ds.GetGeoTransform()
+    xoff, yoff, xsize, ysize = raster_window(gt, ds.RasterYSize, ds.RasterXSize, extent)
+    step = max(1, min(ysize // out_shape[0], xsize // out_shape[1]))
+    nrows, ncols = ysize // step, xsize // step
+    print('- reading %d x %d cell window of %d x %d cells, every %d cells' %
+          (ysize, xsize, ds.RasterYSize, ds.RasterXSize, step))
+    #
+    classes = np.empty((nrows, ncols), dtype=np.int8)
+    for row in range(0, nrows, strip_rows):
+        nstrip = min(strip_rows, nrows - row)
+        strip = band.ReadAsArray(xoff, yoff + row * step, ncols * step, nstrip * step,
+                                 buf_xsize=ncols, buf_ysize=nstrip,
+                                 resample_alg=gdal.GRIORA_NearestNeighbour)
+        valid = np.isfinite(strip) & (strip != nodata)
+        classes[row:row+nstrip] = np.where(valid, strip, nodata_class)
+    ds = None
+    #
+    # flip to south row first as a view, and mask nodata without copying
+    classes = classes[::-1]
+    lons = gt[0] + (xoff + (np.arange(ncols) + 0.5) * step) * gt[1]
+    lats = gt[3] + (yoff + (np.arange(nrows) + 0.5) * step) * gt[5]
+    return {'classes': np.ma.masked_array(classes, mask=(classes == nodata_class), copy=False),
+            'lats': lats[::-1], 'lons': lons, 'step': step}
+
+# end raster_window.py
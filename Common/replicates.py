@@ -0,0 +1,53 @@
+"""
+Python module "replicates.py"
+by Matthew Garcia, Post-doctoral Research Associate
+Dept. of Forest and Wildlife Ecology
+University of Wisconsin - Madison
+matt.e.garcia@gmail.com
+
+Copyright (C) 2021 by Matthew Garcia
+
+Selection of pyATM replicate simulations from the command line. A
+replicate spec is 'all', a replicate number, an N:M range of replicate
+numbers, or a comma-separated list of these; replicate numbers are
+returned as the zero-padded strings used in pyATM output directory names.
+"""
+
+
+import re
+from glob import glob
+
+
+def parse_replicates(args):
+    """remove a '--replicates SPEC' option from command-line arguments,
+    returning the remaining arguments and the replicate spec (None if not
+    given)"""
+    args = list(args)
+    replicates = None
+    if '--replicates' in args:
+        idx = args.index('--replicates')
+        replicates = args[idx+1]
+        del args[idx:idx+2]
+    return args, replicates
+
+
+def replicate_nums(spec, path_pattern):
+    """zero-padded replicate numbers selected by spec, where 'all' selects
+    every replicate with a path matching path_pattern % rep_num"""
+    if spec == 'all':
+        rep_nums = list()
+        for path in sorted(glob(path_pattern % '*')):
+            match = re.search(r'_simulation_(\d+)_', path)
+            if match:
+                rep_nums.append(match.group(1))
+        return rep_nums
+    rep_nums = list()
+    for part in str(spec).split(','):
+        if ':' in part:
+            first, last = part.split(':')
+            rep_nums.extend(range(int(first), int(last) + 1))
+        else:
+            rep_nums.append(int(part))
+    return [str(rep_num).zfill(5) for rep_num in rep_nums]
+
+# end replicates.py
@@ -0,0 +1,79 @@
+"""
+Python module "trajectory_density.py"
+by Matthew Garcia, Post-doctoral Research Associate
+Dept. of Forest and Wildlife Ecology
+University of Wisconsin - Madison
+matt.e.garcia@gmail.com
+
+Copyright (C) 2021 by Matthew Garcia
+
+Rasterization of flight trajectories into a fixed-resolution grid of the
+number of trajectories crossing each cell. All segments of all tracks are
+sampled at once at intervals of no more than one cell (as in DDA line
+drawing), so the cost depends on the total number of track vertices and
+not on the number of tracks, and count grids from separate replicates are
+added together. The result is drawn as a single image layer.
+"""
+
+
+import numpy as np
+import matplotlib.pyplot as plt
+
+
+def density_grid(extent, cell_size):
+    """raster geometry covering an (xmin, xmax, ymin, ymax) extent with
+    cells of about cell_size on a side"""
+    xmin, xmax, ymin, ymax = extent
+    nx = int(np.ceil((xmax - xmin) / cell_size))
+    ny = int(np.ceil((ymax - ymin) / cell_size))
+    return {'extent': (xmin, xmax, ymin, ymax), 'nx': nx, 'ny': ny,
+            'sx': (xmax - xmin) / nx, 'sy': (ymax - ymin) / ny}
+
+
+def accumulate_tracks(grid, x, y, track, counts=None):
+    """add the cells crossed by each track to a (ny, nx) count array,
+    starting a new array if counts is None; consecutive points with the same
+    track number are joined, and each track counts once in each cell"""
+    nx, ny = grid['nx'], grid['ny']
+    if counts is None:
+        counts = np.zeros((ny, nx), dtype=np.int64)
+    xmin, _, ymin, _ = grid['extent']
+    ix = (np.asarray(x, dtype=float) - xmin) / grid['sx']
+    iy = (np.asarray(y, dtype=float) - ymin) / grid['sy']
+    track = np.asarray(track, dtype=np.int64)
+    finite = np.isfinite(ix) & np.isfinite(iy)
+    seg = (track[1:] == track[:-1]) & finite[:-1] & finite[1:]
+    x0, y0 = ix[:-1][seg], iy[:-1][seg]
+    dx, dy = ix[1:][seg] - x0, iy[1:][seg] - y0
+    #
+    # sample every segment at no more than one cell apart, end points included
+    nsteps = np.ceil(np.maximum(np.abs(dx), np.abs(dy))).astype(np.int64) + 1
+    seg_idx = np.repeat(np.arange(len(nsteps)), nsteps)
+    step = np.arange(len(seg_idx)) - np.repeat(np.cumsum(nsteps) - nsteps, nsteps)
+    frac = step / np.maximum(nsteps - 1, 1)[seg_idx]
+    cx = np.floor(x0[seg_idx] + frac * dx[seg_idx]).astype(np.int64)
+    cy = np.floor(y0[seg_idx] + frac * dy[seg_idx]).astype(np.int64)
+    inside = (0 <= cx) & (cx < nx) & (0 <= cy) & (cy < ny)
+    #
+    # count each track only once per cell
+    ncells = nx * ny
+    keys = track[:-1][seg][seg_idx][inside] * ncells + cy[inside] * nx + cx[inside]
+    cells = np.unique(keys) % ncells
+    counts += np.bincount(cells, minlength=ncells).reshape(ny, nx)
+    return counts
+
+
+def draw_density(bmap, grid, counts, ax=None, **kwargs):
+    """draw the cells with non-zero counts as one image"""
+    if ax is None:
+        ax = plt.gca()
+    kwargs.setdefault('interpolation', 'nearest')
+    kwargs.setdefault('zorder', 2)
+    image = ax.imshow(np.ma.masked_equal(counts, 0), origin='lower',
+                      extent=grid['extent'], **kwargs)
+    plt.sca(ax)
+    plt.sci(image)
+    bmap.set_axes_limits(ax=ax)
+    return image
+
+# end trajectory_density.py
@@ -0,0 +1,59 @@
+"""
+Python module "trajectory_drawing.py"
+by Matthew Garcia, Post-doctoral Research Associate
+Dept. of Forest and Wildlife Ecology
+University of Wisconsin - Madison
+matt.e.garcia@gmail.com
+
+Copyright (C) 2021 by Matthew Garcia
+
+Batched drawing of many flight trajectories on a Basemap. All trajectory
+vertices are projected in one call, all tracks are drawn as a single
+LineCollection, and all start and end markers as two scatter collections,
+instead of three Line2D artists (each projected separately) per flier.
+"""
+
+
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
+
+
+def project_tracks(bmap, track_lats, track_lons):
+    """project a list of lat/lon trajectories to map x/y in one call"""
+    lengths = [len(lats) for lats in track_lats]
+    if not lengths:
+        return []
+    x, y = bmap(np.concatenate(track_lons), np.concatenate(track_lats))
+    offsets = np.cumsum(lengths)[:-1]
+    tracks = [np.column_stack((track_x, track_y)) for track_x, track_y in
+              zip(np.split(np.asarray(x), offsets), np.split(np.asarray(y), offsets))]
+    return tracks
+
+
+def draw_trajectories(bmap, track_lats, track_lons, ended=None, ax=None,
+                      color='orange', linewidth=1, markersize=10):
+    """draw trajectories with '+' start markers and 'x' end markers,
+    returning the new artists
+
+    ended optionally selects which trajectories get an end marker (all by
+    default); single-point trajectories get only a start marker
+    """
+    if ax is None:
+        ax = plt.gca()
+    tracks = project_tracks(bmap, track_lats, track_lons)
+    if ended is None:
+        ended = np.ones(len(tracks), dtype=bool)
+    starts = np.array([track[0] for track in tracks]).reshape(-1, 2)
+    ends = np.array([track[-1] for track, end in zip(tracks, ended) if end]).reshape(-1, 2)
+    lines = LineCollection([track for track in tracks if len(track) > 1],
+                           linewidths=linewidth, colors=color, zorder=2)
+    ax.add_collection(lines, autolim=False)
+    start_markers = ax.scatter(starts[:, 0], starts[:, 1], s=markersize**2, marker='+',
+                               color='k', linewidths=1, zorder=2)
+    end_markers = ax.scatter(ends[:, 0], ends[:, 1], s=markersize**2, marker='x',
+                             color='k', linewidths=1, zorder=2)
+    bmap.set_axes_limits(ax=ax)
+    return [lines, start_markers, end_markers]
+
+# end trajectory_drawing.py
@@ -0,0 +1,165 @@
+"""
+Python module "trajectory_store.py"
+by Matthew Garcia, Post-doctoral Research Associate
+Dept. of Forest and Wildlife Ecology
+University of Wisconsin - Madison
+matt.e.garcia@gmail.com
+
+Copyright (C) 2021 by Matthew Garcia
+
+Columnar store for a pyATM replicate's per-flier output directory. The
+first time a replicate is read, all of its flier_*_report.csv files are
+packed into one .npy file per column (all fliers concatenated, date_time
+as integer UTC seconds) plus a flier table with each flier's offset and
+length in those columns and its metadata (sex, takeoff and landing
+indices, number of flights), and a table of every separate flight. The
+store is kept in the "cache" subdirectory of the output directory, keyed
+by the names, sizes and modification times of the CSV files, and its
+columns are memory-mapped so that single-flier lookups only touch that
+flier's rows.
+"""
+
+
+import os
+import shutil
+import hashlib
+from glob import glob
+import numpy as np
+import pandas as pd
+from csv_loader import read_csv_files
+from flight_segments import flight_span, flight_segments
+
+
+store_version = 2
+
+
+def flier_id(fname):
+    """flier ID from a pyATM flier report file name"""
+    return os.path.basename(fname).split('.')[0].split('_')[3]
+
+
+def store_key(fnames):
+    """identify a set of flier files by their names, sizes and mtimes
+    (and the store layout version)"""
+    sha = hashlib.sha1(('%d\n' % store_version).encode())
+    for fname in fnames:
+        stat = os.stat(fname)
+        sha.update(('%s|%d|%d\n' % (os.path.basename(fname), stat.st_size,
+                                    stat.st_mtime_ns)).encode())
+    return sha.hexdigest()[:12]
+
+
+def compact_column(values):
+    """float32/int32 copy of a numeric column, None for other columns"""
+    if np.issubdtype(values.dtype, np.floating):
+        return values.astype(np.float32)
+    if np.issubdtype(values.dtype, np.integer) or np.issubdtype(values.dtype, np.bool_):
+        return values.astype(np.int32)
+    return None
+
+
+def airborne_mask(columns):
+    """samples with the flier above the ground"""
+    if 'alt_AGL' in columns:
+        return np.asarray(columns['alt_AGL']) > 0.0
+    return np.asarray(columns['alt_MSL']) > np.asarray(columns['sfc_elev'])
+
+
+def build_store(fnames, store_dir):
+    """pack flier report CSV files into a columnar store"""
+    dfs = [df.drop(columns=[c for c in df.columns if c.startswith('Unnamed')])
+           for df in read_csv_files(fnames, index_col=None)]
+    lengths = np.array([len(df) for df in dfs], dtype=np.int64)
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    all_df = pd.concat(dfs, ignore_index=True)
+    #
+    columns = dict()
+    for name in all_df.columns:
+        if name == 'date_time':
+            times = pd.to_datetime(all_df[name], utc=True) - pd.Timestamp(0, tz='UTC')
+            columns[name] = np.asarray(times // pd.Timedelta(seconds=1), dtype=np.int64)
+        else:
+            values = compact_column(np.asarray(all_df[name]))
+            if values is not None:
+                columns[name] = values
+    #
+    airborne = airborne_mask(columns)
+    fliers = pd.DataFrame({'flier': [flier_id(fname) for fname in fnames],
+                           'fname': [os.path.basename(fname) for fname in fnames],
+                           'offset': offsets, 'length': lengths})
+    if 'sex' in columns:
+        fliers['sex'] = columns['sex'][offsets]
+    else:
+        fliers['sex'] = -1
+    fliers['takeoff'], fliers['landing'] = flight_span(airborne, offsets)
+    flights = flight_segments(airborne, offsets)
+    fliers['nflights'] = np.bincount(flights['flier_pos'], minlength=len(fliers))
+    flights.insert(0, 'flier', fliers['flier'].values[flights['flier_pos']])
+    #
+    tmp_dir = '%s.%d.tmp' % (store_dir, os.getpid())
+    os.makedirs(tmp_dir, exist_ok=True)
+    for name, values in columns.items():
+        np.save(os.path.join(tmp_dir, '%s.npy' % name), values)
+    fliers.to_csv(os.path.join(tmp_dir, 'fliers.csv'), index=False)
+    flights.drop(columns='flier_pos').to_csv(os.path.join(tmp_dir, 'flights.csv'), index=False)
+    os.replace(tmp_dir, store_dir)
+    return
+
+
+def get_trajectory_store(path, cache_dir=None):
+    """open the columnar store for a pyATM replicate output directory,
+    building it first if necessary"""
+    fnames = sorted(glob('%s/flier_*_report.csv' % path))
+    if cache_dir is None:
+        cache_dir = os.path.join(path, 'cache')
+    store_dir = os.path.join(cache_dir, 'trajectory_store_%s' % store_key(fnames))
+    if not os.path.exists(store_dir):
+        print('- packing %d flier files into %s' % (len(fnames), store_dir))
+        for old_dir in glob(os.path.join(cache_dir, 'trajectory_store_*')):
+            shutil.rmtree(old_dir, ignore_errors=True)
+        os.makedirs(cache_dir, exist_ok=True)
+        build_store(fnames, store_dir)
+    fliers = pd.read_csv(os.path.join(store_dir, 'fliers.csv'), index_col=None,
+                         dtype={'flier': str})
+    flights = pd.read_csv(os.path.join(store_dir, 'flights.csv'), index_col=None,
+                          dtype={'flier': str})
+    store = {'path': store_dir,
+             'fliers': fliers.set_index('flier'),
+             'flights': flights,
+             'names': sorted([os.path.basename(fname)[:-4] for fname in
+                              glob(os.path.join(store_dir, '*.npy'))]),
+             'columns': dict()}
+    return store
+
+
+def get_column(store, name):
+    """memory-mapped column of all fliers' samples"""
+    if name not in store['columns']:
+        store['columns'][name] = np.load(os.path.join(store['path'], '%s.npy' % name),
+                                         mmap_mode='r')
+    return store['columns'][name]
+
+
+def get_flier(store, flier, names):
+    """dict of column arrays for one flier"""
+    offset, length = store['fliers'].loc[flier, ['offset', 'length']]
+    return {name: np.array(get_column(store, name)[offset:offset+length]) for name in names}
+
+
+def flight_tracks(store, names, min_points=3):
+    """column arrays of every flier's samples from first takeoff to last
+    landing, concatenated, for fliers with at least min_points samples in
+    that span, plus the track number of each sample"""
+    fliers = store['fliers']
+    lengths = np.asarray(fliers['landing'] - fliers['takeoff'])
+    keep = (np.asarray(fliers['takeoff']) >= 0) & (lengths >= min_points)
+    starts = np.asarray(fliers['offset'] + fliers['takeoff'])[keep]
+    lengths = lengths[keep]
+    track = np.repeat(np.arange(len(lengths)), lengths)
+    idxs = np.arange(len(track)) - np.repeat(np.cumsum(lengths) - lengths, lengths) + \
+        np.repeat(starts, lengths)
+    tracks = {name: np.asarray(get_column(store, name)[idxs]) for name in names}
+    tracks['track'] = track
+    return tracks
+
+# end trajectory_store.py
@@ -0,0 +1,138 @@
+"""
+Python module "wrf_cache.py"
+by Matthew Garcia, Post-doctoral Research Associate
+Dept. of Forest and Wildlife Ecology
+University of Wisconsin - Madison
+matt.e.garcia@gmail.com
+
+Copyright (C) 2021 by Matthew Garcia
+
+Persistent on-disk cache of wrf-python derived fields for WRF hourly
+output files. Each source file gets one float32 .npz entry in a "cache"
+subdirectory next to the WRF data, keyed by the source path, size, and
+modification time. Fields are added to an entry as they are requested, so
+the map scripts for Fig_03, Fig_06, and the animations only pay the
+getvar() derivation and vertical interpolation cost once per file.
+"""
+
+
+import os
+import hashlib
+import numpy as np
+from netCDF4 import Dataset
+from wrf import getvar, to_np, latlon_coords
+from wrf_levels import interp_levels
+
+
+def cache_key(ncfname):
+    """identify a WRF file version by its path, size, and mtime"""
+    stat = os.stat(ncfname)
+    return '%s|%d|%d' % (os.path.abspath(ncfname), stat.st_size,
+                         stat.st_mtime_ns)
+
+
+def cache_fname(ncfname, cache_dir=None):
+    """location of the cache entry for a given WRF file"""
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(ncfname), 'cache')
+    path_hash = hashlib.sha1(os.path.abspath(ncfname).encode()).hexdigest()
+    basename = os.path.basename(ncfname).split('.')[0]
+    return os.path.join(cache_dir, '%s.%s.npz' % (basename, path_hash[:12]))
+
+
+def level_name(varname, prs):
+    """field name for a 3D variable interpolated to a pressure level [hPa]"""
+    return '%s_%dhPa' % (varname, prs)
+
+
+def split_level_name(name):
+    """inverse of level_name(), returns (varname, None) for plain fields"""
+    varname, _, level = name.rpartition('_')
+    if varname and level.endswith('hPa') and level[:-3].isdigit():
+        return varname, int(level[:-3])
+    return name, None
+
+
+def read_cache(ncfname, names=None, cache_dir=None):
+    """return dict of cached fields (all, or only the given names),
+    or an empty dict if the entry is missing or stale"""
+    fname = cache_fname(ncfname, cache_dir)
+    if not os.path.exists(fname):
+        return dict()
+    with np.load(fname) as npz:
+        if str(npz['_key']) != cache_key(ncfname):
+            return dict()
+        if names is None:
+            names = [name for name in npz.files if name != '_key']
+        fields = {name: npz[name] for name in names if name in npz.files}
+    return fields
+
+
+def write_cache(ncfname, fields, cache_dir=None):
+    """write (replace) the cache entry for a given WRF file"""
+    fname = cache_fname(ncfname, cache_dir)
+    os.makedirs(os.path.dirname(fname), exist_ok=True)
+    tmp_fname = '%s.%d.tmp.npz' % (fname[:-4], os.getpid())
+    np.savez(tmp_fname, _key=np.array(cache_key(ncfname)), **fields)
+    os.replace(tmp_fname, fname)
+    return
+
+
+def derive_fields(ncfname, names, fields):
+    """compute any requested fields not already present in fields"""
+    varnames = list()
+    levels = dict()
+    for name in names:
+        varname, prs = split_level_name(name)
+        if prs is not None:
+            levels.setdefault(varname, list()).append(prs)
+            varname_list = [varname, 'pressure']
+        else:
+            varname_list = [varname]
+        for vname in varname_list:
+            if vname not in varnames:
+                varnames.append(vname)
+    ncfile = Dataset(ncfname, 'r')
+    for varname in varnames:
+        if varname in ('lats', 'lons') or varname in fields:
+            continue
+        var = getvar(ncfile, varname)
+        fields[varname] = to_np(var).astype(np.float32)
+        if 'lats' not in fields:
+            lats, lons = latlon_coords(var)
+            fields['lats'] = to_np(lats).astype(np.float32)
+            fields['lons'] = to_np(lons).astype(np.float32)
+    if 'lats' not in fields:
+        var = getvar(ncfile, 'T2')
+        lats, lons = latlon_coords(var)
+        fields['lats'] = to_np(lats).astype(np.float32)
+        fields['lons'] = to_np(lons).astype(np.float32)
+    ncfile.close()
+    if levels:
+        level_vars = list(levels)
+        all_levels = sorted(set(prs for prs_list in levels.values() for prs in prs_list))
+        interp = interp_levels([fields[varname] for varname in level_vars],
+                               fields['pressure'], all_levels)
+        for i, varname in enumerate(level_vars):
+            for j, prs in enumerate(all_levels):
+                fields[level_name(varname, prs)] = interp[i, j].astype(np.float32)
+    return fields
+
+
+def get_wrf_fields(ncfname, names, cache_dir=None):
+    """return derived fields for one WRF hourly file, using the cache
+
+    names are wrf-python getvar() names, or level_name() names for 3D
+    variables interpolated to a pressure level; 'lats' and 'lons' for the
+    mass grid are always included in the returned dict
+    """
+    names = list(names) + ['lats', 'lons']
+    fields = read_cache(ncfname, names, cache_dir)
+    missing = [name for name in names if name not in fields]
+    if missing:
+        print('- deriving %d fields for %s' % (len(missing), ncfname.split('/')[-1]))
+        fields = derive_fields(ncfname, missing, read_cache(ncfname, None, cache_dir))
+        write_cache(ncfname, fields, cache_dir)
+    return {name: fields[name] for name in names}
+
+# end wrf_cache.py
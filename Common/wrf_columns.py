@@ -0,0 +1,119 @@
+"""
+Python module "wrf_columns.py"
+by Matthew Garcia, Post-doctoral Research Associate
+Dept. of Forest and Wildlife Ecology
+University of Wisconsin - Madison
+matt.e.garcia@gmail.com
+
+Copyright (C) 2021 by Matthew Garcia
+
+Read vertical columns of WRF fields at a set of grid points directly from
+an open netCDF file using hyperslab slicing, so that profiles at many
+sites cost a few small reads per site instead of full-domain getvar()
+cubes. Fields stored in the file are sliced as-is; the few wrf-python
+diagnostics used here are derived from their sliced base variables
+following the wrf-python definitions. Earth-relative winds are destaggered
+to mass points and rotated from grid to earth coordinates with the map
+rotation that wrf-python's uvmet computes from the Lambert cone factor and
+the projection's standard longitude.
+"""
+
+
+import numpy as np
+
+
+G = 9.81  # m/s2
+P0 = 100000.0  # Pa
+RD_CP = 287.0 / 1004.5
+
+
+def column_index(var, y, x):
+    """netCDF index tuple for the column of var at grid point (y, x)"""
+    idx = list()
+    for dim in var.dimensions[:-2]:
+        if dim == 'Time':
+            idx.append(0)
+        else:
+            idx.append(slice(None))
+    idx.extend([y, x])
+    return tuple(idx)
+
+
+def cone_factor(ncfile):
+    """cone factor of the WRF map projection, as wrf-python computes it"""
+    map_proj = ncfile.getncattr('MAP_PROJ')
+    if map_proj == 2:
+        return 1.0
+    true_lat1 = ncfile.getncattr('TRUELAT1')
+    true_lat2 = ncfile.getncattr('TRUELAT2')
+    if (abs(true_lat1 - true_lat2) > 0.1) and (abs(true_lat2 - 90.0) > 0.1):
+        cone = np.log(np.cos(np.radians(true_lat1))) - np.log(np.cos(np.radians(true_lat2)))
+        return cone / (np.log(np.tan(np.radians(45.0 - abs(true_lat1 / 2.0)))) -
+                       np.log(np.tan(np.radians(45.0 - abs(true_lat2 / 2.0)))))
+    return np.sin(np.radians(abs(true_lat1)))
+
+
+def rotation_columns(ncfile, ys, xs):
+    """cosine and sine of the grid-to-earth wind rotation at grid points
+    (ys, xs); no rotation for projections with earth-aligned grids"""
+    if ncfile.getncattr('MAP_PROJ') not in (1, 2):
+        return np.ones(len(ys)), np.zeros(len(ys))
+    if 'STAND_LON' in ncfile.ncattrs():
+        cen_lon = ncfile.getncattr('STAND_LON')
+    else:
+        cen_lon = ncfile.getncattr('CEN_LON')
+    lats = read_columns(ncfile, 'XLAT', ys, xs)[:, 0]
+    lons = read_columns(ncfile, 'XLONG', ys, xs)[:, 0]
+    dlons = lons - cen_lon
+    dlons = np.where(dlons > 180.0, dlons - 360.0, dlons)
+    dlons = np.where(dlons < -180.0, dlons + 360.0, dlons)
+    alpha = np.radians(np.where(lats < 0.0, -dlons, dlons) * cone_factor(ncfile))
+    return np.cos(alpha), np.sin(alpha)
+
+
+def read_columns(ncfile, varname, ys, xs):
+    """return (npoints, nz) array of varname columns at grid points (ys, xs);
+    2D fields are returned with nz = 1"""
+    if varname in ncfile.variables:
+        var = ncfile.variables[varname]
+        columns = list()
+        for y, x in zip(ys, xs):
+            column = np.ma.ravel(var[column_index(var, y, x)]).astype(np.float64)
+            columns.append(np.ma.filled(column, np.nan))
+        return np.array(columns)
+    if varname == 'geopotential_height':
+        geopt = read_columns(ncfile, 'PH', ys, xs) + \
+            read_columns(ncfile, 'PHB', ys, xs)
+        return 0.5 * (geopt[:, :-1] + geopt[:, 1:]) / G
+    if varname == 'pressure':
+        return (read_columns(ncfile, 'P', ys, xs) +
+                read_columns(ncfile, 'PB', ys, xs)) / 100.0
+    if varname == 'temperature':
+        theta = read_columns(ncfile, 'T', ys, xs) + 300.0
+        prs = read_columns(ncfile, 'P', ys, xs) + read_columns(ncfile, 'PB', ys, xs)
+        return theta * (prs / P0)**RD_CP
+    if varname in ('ue_unstaggered', 've_unstaggered', 'u10_e', 'v10_e'):
+        if varname.endswith('_unstaggered'):
+            u = 0.5 * (read_columns(ncfile, 'U', ys, xs) +
+                       read_columns(ncfile, 'U', ys, np.asarray(xs) + 1))
+            v = 0.5 * (read_columns(ncfile, 'V', ys, xs) +
+                       read_columns(ncfile, 'V', np.asarray(ys) + 1, xs))
+        else:
+            u = read_columns(ncfile, 'U10', ys, xs)
+            v = read_columns(ncfile, 'V10', ys, xs)
+        cosa, sina = [a[:, np.newaxis] for a in rotation_columns(ncfile, ys, xs)]
+        if varname.startswith('u'):
+            return u * cosa + v * sina
+        return v * cosa - u * sina
+    raise KeyError('%s not available as a WRF column variable' % varname)
+
+
+def interp_columns(columns, heights, levels):
+    """linearly interpolate (npoints, nz) columns from their heights to common
+    levels; returns (npoints, nlevels), NaN outside each column's range"""
+    profiles = np.full((len(columns), len(levels)), np.nan)
+    for i, (column, height) in enumerate(zip(columns, heights)):
+        profiles[i] = np.interp(levels, height, column, left=np.nan, right=np.nan)
+    return profiles
+
+# end wrf_columns.py
@@ -0,0 +1,87 @@
+"""
+Python module "wrf_grid_index.py"
+by Matthew Garcia, Post-doctoral Research Associate
+Dept. of Forest and Wildlife Ecology
+University of Wisconsin - Madison
+matt.e.garcia@gmail.com
+
+Copyright (C) 2021 by Matthew Garcia
+
+Nearest-grid-point lookups on the WRF mass grid using a KD-tree over 3D
+Cartesian (unit sphere) coordinates, so distances account for longitude
+convergence. The tree is built once per domain from XLAT/XLONG, pickled in
+the "cache" subdirectory next to the WRF data, and answers any number of
+point lookups in one vectorized query.
+"""
+
+
+import os
+import pickle
+import hashlib
+import numpy as np
+from netCDF4 import Dataset
+from scipy.spatial import cKDTree
+
+
+def latlon_to_xyz(lats, lons):
+    """unit-sphere Cartesian coordinates, shape (npoints, 3)"""
+    lats = np.radians(np.ravel(lats).astype(np.float64))
+    lons = np.radians(np.ravel(lons).astype(np.float64))
+    return np.column_stack((np.cos(lats) * np.cos(lons),
+                            np.cos(lats) * np.sin(lons),
+                            np.sin(lats)))
+
+
+def read_grid_latlon(ncfname):
+    """mass grid XLAT/XLONG from a WRF file"""
+    ncfile = Dataset(ncfname, 'r')
+    lats = np.array(ncfile.variables['XLAT'][0])
+    lons = np.array(ncfile.variables['XLONG'][0])
+    ncfile.close()
+    return lats, lons
+
+
+def grid_key(lats, lons):
+    """identify a domain by the contents of its coordinate arrays"""
+    sha = hashlib.sha1()
+    sha.update(np.ascontiguousarray(lats, dtype=np.float32).tobytes())
+    sha.update(np.ascontiguousarray(lons, dtype=np.float32).tobytes())
+    return '%s_%s' % ('x'.join([str(n) for n in np.shape(lats)]), sha.hexdigest()[:12])
+
+
+def build_grid_index(lats, lons):
+    """KD-tree index for a 2D lat/lon grid"""
+    return {'key': grid_key(lats, lons),
+            'shape': np.shape(lats),
+            'tree': cKDTree(latlon_to_xyz(lats, lons))}
+
+
+def get_grid_index(ncfname, cache_dir=None):
+    """load the pickled grid index for the domain of a WRF file,
+    building and saving it first if necessary"""
+    lats, lons = read_grid_latlon(ncfname)
+    key = grid_key(lats, lons)
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(ncfname), 'cache')
+    grid_num = ncfname.split('/')[-1].split('.')[0].split('_')[2]
+    fname = os.path.join(cache_dir, 'grid_index_%s_%s.pkl' % (grid_num, key))
+    if os.path.exists(fname):
+        with open(fname, 'rb') as f:
+            return pickle.load(f)
+    print('- building grid index for %s' % grid_num)
+    index = build_grid_index(lats, lons)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_fname = '%s.%d.tmp' % (fname, os.getpid())
+    with open(tmp_fname, 'wb') as f:
+        pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_fname, fname)
+    return index
+
+
+def find_grid_yx(index, plats, plons):
+    """nearest grid (y, x) indices for arrays of point lats/lons"""
+    _, idxs = index['tree'].query(latlon_to_xyz(plats, plons))
+    ys, xs = np.unravel_index(idxs, index['shape'])
+    return ys, xs
+
+# end wrf_grid_index.py
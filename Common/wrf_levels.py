@@ -0,0 +1,51 @@
+"""
+Python module "wrf_levels.py"
+by Matthew Garcia, Post-doctoral Research Associate
+Dept. of Forest and Wildlife Ecology
+University of Wisconsin - Madison
+matt.e.garcia@gmail.com
+
+Copyright (C) 2021 by Matthew Garcia
+
+Vectorized multi-variable, multi-level vertical interpolation of WRF 3D
+fields to pressure levels. The bracketing model levels and weights are
+found once per column for all requested levels, then applied to every
+variable in a single NumPy pass, instead of one interplevel() scan per
+variable and level.
+"""
+
+
+import numpy as np
+
+
+def level_brackets(P, levels):
+    """find lower bracketing model level index, linear weight, and validity
+    mask for each target pressure level in every column of P (nz, ny, nx),
+    where P decreases with height; returned arrays are (nlevels, ny, nx)"""
+    P = np.asarray(P, dtype=np.float64)
+    levels = np.asarray(levels, dtype=np.float64)
+    nz = P.shape[0]
+    n_below = np.sum(P[np.newaxis] >= levels[:, np.newaxis, np.newaxis, np.newaxis], axis=1)
+    k0 = np.clip(n_below - 1, 0, nz - 2)
+    P0 = np.take_along_axis(P, k0, axis=0)
+    P1 = np.take_along_axis(P, k0 + 1, axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weight = (P0 - levels[:, np.newaxis, np.newaxis]) / (P0 - P1)
+    valid = (weight >= 0.0) & (weight <= 1.0)
+    return k0, weight, valid
+
+
+def interp_levels(fields, P, levels):
+    """interpolate a sequence of 3D fields (nz, ny, nx) to the given pressure
+    levels in one pass; returns array (nvars, nlevels, ny, nx), with NaN
+    where a level is below ground or above the model top"""
+    k0, weight, valid = level_brackets(P, levels)
+    cube = np.stack([np.asarray(field, dtype=np.float64) for field in fields])
+    idx0 = np.broadcast_to(k0[np.newaxis], (cube.shape[0],) + k0.shape)
+    f0 = np.take_along_axis(cube, idx0, axis=1)
+    f1 = np.take_along_axis(cube, idx0 + 1, axis=1)
+    interp = f0 + weight[np.newaxis] * (f1 - f0)
+    interp[:, ~valid] = np.nan
+    return interp
+
+# end wrf_levels.py
@@ -10,16 +10,19 @@ basic structure borrowed from wrf-python documentation
 """
 
 
+import os
 import sys
 from glob import glob
 import numpy as np
-from netCDF4 import Dataset
-from wrf import getvar, to_np, latlon_coords, smooth2d, interplevel
+from wrf import to_np, smooth2d
 import matplotlib as mpl
 from matplotlib.cm import get_cmap
-from mpl_toolkits.basemap import Basemap
 mpl.use('Agg')
 import matplotlib.pyplot as plt
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Common'))
+from wrf_cache import get_wrf_fields, level_name
+from parallel_jobs import parse_workers, run_jobs
+from basemap_cache import get_basemap, get_projected_grid
 
 
 bottom_lat, top_lat = 45.0, 51.0
@@ -28,20 +31,15 @@ left_lon, right_lon = -73.0, -64.0
 mid_lon = (left_lon + right_lon) / 2.0
 
 
-def T_wind_map(T, U, V, fname):
+def T_wind_map(lats, lons, T, U, V, fname):
     """generate map figure using matplotlib Basemap module"""
     fig = plt.figure(figsize=(8, 8))
-    bmap = Basemap(projection='tmerc', lon_0=mid_lon,
-                   lat_0=mid_lat, lat_ts=mid_lat,
-                   llcrnrlat=bottom_lat, llcrnrlon=left_lon,
-                   urcrnrlat=top_lat, urcrnrlon=right_lon,
-                   resolution='h', area_thresh=500)
+    bmap = get_basemap(bottom_lat, top_lat, left_lon, right_lon)
     bmap.drawcoastlines()
     bmap.drawstates()
     bmap.drawcountries()
     #
-    lats, lons = latlon_coords(T)
-    x, y = bmap(to_np(lons), to_np(lats))
+    x, y = get_projected_grid(bmap, lats, lons)
     #
     # smooth the T variable
     spatial_range = 3
@@ -75,20 +73,15 @@ def T_wind_map(T, U, V, fname):
     return
 
 
-def windspeed_map(U, V, fname):
+def windspeed_map(lats, lons, U, V, fname):
     """generate map figure using matplotlib Basemap module"""
     fig = plt.figure(figsize=(8, 8))
-    bmap = Basemap(projection='tmerc', lon_0=mid_lon,
-                   lat_0=mid_lat, lat_ts=mid_lat,
-                   llcrnrlat=bottom_lat, llcrnrlon=left_lon,
-                   urcrnrlat=top_lat, urcrnrlon=right_lon,
-                   resolution='h', area_thresh=500)
+    bmap = get_basemap(bottom_lat, top_lat, left_lon, right_lon)
     bmap.drawcoastlines()
     bmap.drawstates()
     bmap.drawcountries()
     #
-    lats, lons = latlon_coords(U)
-    x, y = bmap(to_np(lons), to_np(lats))
+    x, y = get_projected_grid(bmap, lats, lons)
     #
     # generate and smooth the windspeed variable
     windspeed = np.sqrt(to_np(U)**2 + to_np(V)**2)
@@ -123,31 +116,48 @@ def windspeed_map(U, V, fname):
     return
 
 
-print()
-sim_date = sys.argv[1]
-path = '../Data/%s/WRF' % sim_date
-ncfnames = sorted(glob('%s/*.nc' % path))
-print('found %d files' % len(ncfnames))
-print()
-#
-prs = 900
-for ncfname in ncfnames:
-    print('plotting upper-air T/wind for %s at %d hPa' % (ncfname, prs))
+def plot_wrf_file(ncfname, prs_levels):
+    """plot upper-air maps at all requested pressure levels for one WRF file"""
+    print('plotting upper-air T/wind for %s at %s hPa' %
+          (ncfname, '/'.join([str(prs) for prs in prs_levels])))
     grid_num = int(ncfname.split('/')[-1].split('.')[0].split('_')[2][-1:])
     date_str = ncfname.split('/')[-1].split('.')[0].split('_')[3]
     time_str = ncfname.split('/')[-1].split('.')[0].split('_')[4][:-3]
-    ncfile = Dataset(ncfname, 'r')    
-    P = getvar(ncfile, 'pressure')
-    T = getvar(ncfile, 'temperature')
-    U = getvar(ncfile, 'ue_unstaggered')
-    V = getvar(ncfile, 've_unstaggered')
-    T_prs = interplevel(T, P, prs)
-    U_prs = interplevel(U, P, prs)
-    V_prs = interplevel(V, P, prs)
-    fname = 'WRF_d%s_%s_%s_T_wind_%dhPa.png' % (str(grid_num).zfill(2), date_str, time_str, prs)
-    T_wind_map(T_prs, U_prs, V_prs, fname)
-    fname = 'WRF_d%s_%s_%s_windspeed_%dhPa.png' % (str(grid_num).zfill(2), date_str, time_str, prs)
-    windspeed_map(U_prs, V_prs, fname)
+    varnames = ['temperature', 'ue_unstaggered', 've_unstaggered']
+    fields = get_wrf_fields(ncfname, [level_name(varname, prs)
+                                      for varname in varnames for prs in prs_levels])
+    lats, lons = fields['lats'], fields['lons']
+    for prs in prs_levels:
+        T_prs = fields[level_name('temperature', prs)]
+        U_prs = fields[level_name('ue_unstaggered', prs)]
+        V_prs = fields[level_name('ve_unstaggered', prs)]
+        fname = 'WRF_d%s_%s_%s_T_wind_%dhPa.png' % (str(grid_num).zfill(2), date_str, time_str, prs)
+        T_wind_map(lats, lons, T_prs, U_prs, V_prs, fname)
+        fname = 'WRF_d%s_%s_%s_windspeed_%dhPa.png' % (str(grid_num).zfill(2), date_str, time_str, prs)
+        windspeed_map(lats, lons, U_prs, V_prs, fname)
     print()
+    return
+
+
+def main(args):
+    """map WRF pressure-level winds for every output time of a night"""
+    print()
+    args, workers = parse_workers(list(args))
+    sim_date = args[0]
+    path = '../Data/%s/WRF' % sim_date
+    ncfnames = sorted(glob('%s/*.nc' % path))
+    print('found %d files' % len(ncfnames))
+    print()
+    #
+    if len(args) > 1:
+        prs_levels = [int(arg) for arg in args[1:]]
+    else:
+        prs_levels = [900]
+    run_jobs(plot_wrf_file, [(ncfname, prs_levels) for ncfname in ncfnames], workers)
+    return
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
 
 # end map_wrf_io_T_wind_prs.py
@@ -10,16 +10,19 @@ basic structure borrowed from wrf-python documentation
 """
 
 
+import os
 import sys
 from glob import glob
 import numpy as np
-from netCDF4 import Dataset
-from wrf import getvar, to_np, latlon_coords, smooth2d
+from wrf import to_np, smooth2d
 import matplotlib as mpl
 from matplotlib.cm import get_cmap
-from mpl_toolkits.basemap import Basemap
 mpl.use('Agg')
 import matplotlib.pyplot as plt
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Common'))
+from wrf_cache import get_wrf_fields
+from parallel_jobs import parse_workers, run_jobs
+from basemap_cache import get_basemap, get_projected_grid
 
 
 bottom_lat, top_lat = 45.0, 51.0
@@ -28,20 +31,15 @@ left_lon, right_lon = -73.0, -64.0
 mid_lon = (left_lon + right_lon) / 2.0
 
 
-def plot_T_wind_map(T2, U10, V10, fname):
+def plot_T_wind_map(lats, lons, T2, U10, V10, fname):
     """generate map figure using matplotlib Basemap module"""
     fig = plt.figure(figsize=(8, 8))
-    bmap = Basemap(projection='tmerc', lon_0=mid_lon,
-                   lat_0=mid_lat, lat_ts=mid_lat,
-                   llcrnrlat=bottom_lat, llcrnrlon=left_lon,
-                   urcrnrlat=top_lat, urcrnrlon=right_lon,
-                   resolution='h', area_thresh=500)
+    bmap = get_basemap(bottom_lat, top_lat, left_lon, right_lon)
     bmap.drawcoastlines()
     bmap.drawstates()
     bmap.drawcountries()
     #
-    lats, lons = latlon_coords(T2)
-    x, y = bmap(to_np(lons), to_np(lats))
+    x, y = get_projected_grid(bmap, lats, lons)
     #
     # smooth the T2 variable
     spatial_range = 3
@@ -75,20 +73,15 @@ def plot_T_wind_map(T2, U10, V10, fname):
     return
 
 
-def plot_windspeed_map(U10, V10, fname):
+def plot_windspeed_map(lats, lons, U10, V10, fname):
     """generate map figure using matplotlib Basemap module"""
     fig = plt.figure(figsize=(8, 8))
-    bmap = Basemap(projection='tmerc', lon_0=mid_lon,
-                   lat_0=mid_lat, lat_ts=mid_lat,
-                   llcrnrlat=bottom_lat, llcrnrlon=left_lon,
-                   urcrnrlat=top_lat, urcrnrlon=right_lon,
-                   resolution='h', area_thresh=500)
+    bmap = get_basemap(bottom_lat, top_lat, left_lon, right_lon)
     bmap.drawcoastlines()
     bmap.drawstates()
     bmap.drawcountries()
     #
-    lats, lons = latlon_coords(U10)
-    x, y = bmap(to_np(lons), to_np(lats))
+    x, y = get_projected_grid(bmap, lats, lons)
     #
     # generate and smooth the windspeed variable
     windspeed = np.sqrt(to_np(U10)**2 + to_np(V10)**2)
@@ -123,26 +116,38 @@ def plot_windspeed_map(U10, V10, fname):
     return
 
 
-print()
-sim_date = sys.argv[1]
-path = '../Data/%s/WRF' % sim_date
-ncfnames = sorted(glob('%s/*.nc' % path))
-print('found %d files' % len(ncfnames))
-print()
-#
-for ncfname in ncfnames:
+def plot_wrf_file(ncfname):
+    """plot surface maps for one WRF file"""
     print('plotting surface T/wind for %s' % ncfname)
     grid_num = int(ncfname.split('/')[-1].split('.')[0].split('_')[2][-1:])
     date_str = ncfname.split('/')[-1].split('.')[0].split('_')[3]
     time_str = ncfname.split('/')[-1].split('.')[0].split('_')[4][:-3]
-    ncfile = Dataset(ncfname, 'r')
-    T2 = getvar(ncfile, 'T2')
-    U10 = getvar(ncfile, 'u10_e')
-    V10 = getvar(ncfile, 'v10_e')
+    fields = get_wrf_fields(ncfname, ['T2', 'u10_e', 'v10_e'])
+    lats, lons = fields['lats'], fields['lons']
+    T2, U10, V10 = fields['T2'], fields['u10_e'], fields['v10_e']
     fname = 'WRF_d%s_%s_%s_T_wind_sfc.png' % (str(grid_num).zfill(2), date_str, time_str)
-    plot_T_wind_map(T2, U10, V10, fname)
+    plot_T_wind_map(lats, lons, T2, U10, V10, fname)
     fname = 'WRF_d%s_%s_%s_windspeed_sfc.png' % (str(grid_num).zfill(2), date_str, time_str)
-    plot_windspeed_map(U10, V10, fname)
+    plot_windspeed_map(lats, lons, U10, V10, fname)
     print()
+    return
+
+
+def main(args):
+    """map WRF surface temperature and winds for every output time of a night"""
+    print()
+    args, workers = parse_workers(list(args))
+    sim_date = args[0]
+    path = '../Data/%s/WRF' % sim_date
+    ncfnames = sorted(glob('%s/*.nc' % path))
+    print('found %d files' % len(ncfnames))
+    print()
+    #
+    run_jobs(plot_wrf_file, [(ncfname,) for ncfname in ncfnames], workers)
+    return
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
 
 # end map_wrf_io_T_wind_sfc.py
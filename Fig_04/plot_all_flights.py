@@ -10,109 +10,158 @@ Copyright (C) 2021 by Matthew Garcia
 """
 
 
+import os
 import sys
+from functools import partial
 from glob import glob
 import numpy as np
-import pandas as pd
 from netCDF4 import Dataset
 from wrf import getvar, latlon_coords
 import matplotlib as mpl
 from matplotlib.cm import get_cmap
-from mpl_toolkits.basemap import Basemap
+from matplotlib.colors import LogNorm
 mpl.use('Agg')
 import matplotlib.pyplot as plt
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Common'))
+from basemap_cache import get_basemap, get_projected_grid
+from parallel_jobs import parse_workers, run_jobs
+from replicates import replicate_nums
+from trajectory_drawing import draw_trajectories
+from trajectory_density import density_grid, accumulate_tracks, draw_density
+from trajectory_store import get_trajectory_store, get_flier, flight_tracks
 
 
-def get_trajectory(infname):
-    """get trajectory from pyATM individual flier output file."""
-    df = pd.read_csv(infname, index_col=None)
-    lats = np.array(df['lat'])
-    lons = np.array(df['lon'])
-    alt_AGL = np.array(df['alt_AGL'])
-    if np.any(alt_AGL > 0.0):
-        idx1 = 0
-        for idx, alt in enumerate(alt_AGL):
-            if alt > 0.0:
-                idx1 = idx - 1
-                break
-        idx2 = -1
-        for idx in range(len(alt_AGL)-1, -1, -1):
-            if alt_AGL[idx] > 0.0:
-                idx2 = idx + 1
-                break
-        traj_lats = lats[idx1:idx2]
-        traj_lons = lons[idx1:idx2]
+bottom_lat, top_lat = 45.0, 51.0
+mid_lat = (bottom_lat + top_lat) / 2.0
+left_lon, right_lon = -73.0, -64.0
+mid_lon = (left_lon + right_lon) / 2.0
+
+# trajectory density cell size [m]
+density_cell_size = 2000.0
+
+
+def get_trajectory(store, flier):
+    """get trajectory from pyATM individual flier output in the replicate store."""
+    takeoff, landing = store['fliers'].loc[flier, ['takeoff', 'landing']]
+    if takeoff >= 0:
+        locs = get_flier(store, flier, ['lat', 'lon'])
+        traj_lats = locs['lat'][takeoff:landing]
+        traj_lons = locs['lon'][takeoff:landing]
     else:
         traj_lats = []
         traj_lons = []
     return traj_lats, traj_lons
 
 
-print()
-sim_date = sys.argv[1]
-rep_num = sys.argv[2]
-#
-# setup map
-bottom_lat, top_lat = 45.0, 51.0
-mid_lat = (bottom_lat + top_lat) / 2.0
-left_lon, right_lon = -73.0, -64.0
-mid_lon = (left_lon + right_lon) / 2.0
-#
-plt.figure(figsize=(8, 8))
-bmap = Basemap(projection='tmerc', lon_0=mid_lon, lat_0=mid_lat,
-               lat_ts=mid_lat, llcrnrlat=bottom_lat, llcrnrlon=left_lon,
-               urcrnrlat=top_lat, urcrnrlon=right_lon, resolution='h',
-               area_thresh=500)
-bmap.drawcoastlines()
-bmap.drawstates()
-bmap.drawcountries()
-#
-# draw map references
-bmap.drawmapscale(lon=left_lon+1.25, lat=top_lat-0.5, lon0=mid_lon, lat0=mid_lat, length=200.0,
-                  barstyle='fancy', fillcolor1='w', fillcolor2='k', fontsize=16)
-parallels = np.arange(30., 60., 1.)
-bmap.drawparallels(parallels, labels=[1, 0, 0, 0], fontsize=16)
-meridians = np.arange(270., 360., 1.)
-bmap.drawmeridians(meridians, labels=[0, 0, 0, 1], fontsize=16)
-#
-# get topography from WRF
-path = '../Data/%s/WRF' % sim_date
-ncfnames = sorted(glob('%s/*.nc' % path))
-print('reading WRF topography from %s' % ncfnames[0].split('/')[-1])
-ncfile = Dataset(ncfnames[0], 'r')
-topography = getvar(ncfile, 'HGT')
-wrf_lats, wrf_lons = latlon_coords(topography)
-lons, lats = bmap(wrf_lons, wrf_lats)
-#
-# plot topography from WRF
-bmap.contourf(lons, lats, topography, 48, cmap=get_cmap('gist_earth'))
-cbar = plt.colorbar(pad=0.02, shrink=0.75)
-labels = np.arange(0, 1075, 125)
-cbar.ax.set_yticks(labels)
-cbar.ax.set_yticklabels(labels=labels, rotation=90, va='center', fontsize=16)
-cbar.ax.set_ylabel('surface elevation [m AMSL]', fontsize=16)
-print('- mapped WRF topography')
-#
-# plot flight trajectories from pyATM
-path = '../Data/%s/pyATM/WRF-NARR_d03_%s_simulation_%s_output' % (sim_date, sim_date, str(rep_num).zfill(5))
-infnames = sorted(glob('%s/*.csv' % path))
-print('found %d Flier data files for %s simulation replicate %s' %
-      (len(infnames), sim_date, str(rep_num).zfill(5)))
-nflights = 0
-for infname in infnames:
-    traj_lats, traj_lons = get_trajectory(infname)
-    npts = len(traj_lats)
-    if npts > 2:
-        bmap.plot(traj_lons[0], traj_lats[0], '+', markersize=10, color='k', latlon=True)
-        bmap.plot(traj_lons[-1], traj_lats[-1], 'x', markersize=10, color='k', latlon=True)
-        bmap.plot(traj_lons, traj_lats, linewidth=1, color='orange', latlon=True)
-        nflights += 1
-print('- plotted %d flight trajectories' % nflights)
-#
-plt.tight_layout()
-fname = '%s_flight_trajectories_default_replicate_%s.png' % (sim_date, str(rep_num).zfill(5))
-plt.savefig(fname, dpi=300, bbox_inches='tight')
-print('- saved %s' % fname)
-plt.close()
+def output_path(sim_date, rep_num):
+    """pyATM individual flier output directory for a replicate"""
+    return '../Data/%s/pyATM/WRF-NARR_d03_%s_simulation_%s_output' % (sim_date, sim_date, rep_num)
+
+
+def plot_replicate_trajectories(bmap, sim_date, rep_num):
+    """draw the flight trajectories of one replicate as lines"""
+    store = get_trajectory_store(output_path(sim_date, rep_num))
+    print('found %d Flier data files for %s simulation replicate %s' %
+          (len(store['fliers']), sim_date, rep_num))
+    all_traj_lats = list()
+    all_traj_lons = list()
+    for flier in store['fliers'].index:
+        traj_lats, traj_lons = get_trajectory(store, flier)
+        npts = len(traj_lats)
+        if npts > 2:
+            all_traj_lats.append(traj_lats)
+            all_traj_lons.append(traj_lons)
+    draw_trajectories(bmap, all_traj_lats, all_traj_lons)
+    print('- plotted %d flight trajectories' % len(all_traj_lats))
+    print('- %d fliers made more than one flight (plotted from first takeoff to last landing)' %
+          np.sum(store['fliers']['nflights'] > 1))
+    return
+
+
+def rasterize_replicate_trajectories(sim_date, grid, rep_num):
+    """count the flight trajectories of one replicate crossing each cell"""
+    store = get_trajectory_store(output_path(sim_date, rep_num))
+    tracks = flight_tracks(store, ['lat', 'lon'], min_points=3)
+    bmap = get_basemap(bottom_lat, top_lat, left_lon, right_lon)
+    x, y = bmap(tracks['lon'], tracks['lat'])
+    counts = accumulate_tracks(grid, x, y, tracks['track'])
+    print('- rasterized %d flight trajectories (%d points) for replicate %s' %
+          (np.max(tracks['track'], initial=-1) + 1, len(tracks['track']), rep_num))
+    return counts
+
+
+def main(args):
+    """map all flight trajectories (or their density) of the selected replicates"""
+    print()
+    args, workers = parse_workers(list(args))
+    use_density = '--density' in args
+    if use_density:
+        args.remove('--density')
+    sim_date = args[0]
+    rep_nums = replicate_nums(args[1], output_path(sim_date, '%s'))
+    #
+    # setup map
+    plt.figure(figsize=(8, 8))
+    bmap = get_basemap(bottom_lat, top_lat, left_lon, right_lon)
+    map_extent = (0.0, bmap.urcrnrx, 0.0, bmap.urcrnry)
+    bmap.drawcoastlines()
+    bmap.drawstates()
+    bmap.drawcountries()
+    #
+    # draw map references
+    bmap.drawmapscale(lon=left_lon+1.25, lat=top_lat-0.5, lon0=mid_lon, lat0=mid_lat, length=200.0,
+                      barstyle='fancy', fillcolor1='w', fillcolor2='k', fontsize=16)
+    parallels = np.arange(30., 60., 1.)
+    bmap.drawparallels(parallels, labels=[1, 0, 0, 0], fontsize=16)
+    meridians = np.arange(270., 360., 1.)
+    bmap.drawmeridians(meridians, labels=[0, 0, 0, 1], fontsize=16)
+    #
+    # get topography from WRF
+    path = '../Data/%s/WRF' % sim_date
+    ncfnames = sorted(glob('%s/*.nc' % path))
+    print('reading WRF topography from %s' % ncfnames[0].split('/')[-1])
+    ncfile = Dataset(ncfnames[0], 'r')
+    topography = getvar(ncfile, 'HGT')
+    wrf_lats, wrf_lons = latlon_coords(topography)
+    lons, lats = get_projected_grid(bmap, wrf_lats, wrf_lons)
+    #
+    # plot topography from WRF
+    bmap.contourf(lons, lats, topography, 48, cmap=get_cmap('gist_earth'))
+    cbar = plt.colorbar(pad=0.02, shrink=0.75)
+    labels = np.arange(0, 1075, 125)
+    cbar.ax.set_yticks(labels)
+    cbar.ax.set_yticklabels(labels=labels, rotation=90, va='center', fontsize=16)
+    cbar.ax.set_ylabel('surface elevation [m AMSL]', fontsize=16)
+    print('- mapped WRF topography')
+    #
+    # plot flight trajectories from pyATM
+    if use_density:
+        grid = density_grid(map_extent, density_cell_size)
+        counts = sum(run_jobs(partial(rasterize_replicate_trajectories, sim_date, grid),
+                              [(rep_num,) for rep_num in rep_nums], workers))
+        draw_density(bmap, grid, counts, cmap=get_cmap('inferno'), norm=LogNorm(vmin=1))
+        cbar = plt.colorbar(orientation='horizontal', pad=0.06, shrink=0.75)
+        cbar.ax.tick_params(labelsize=16)
+        cbar.ax.set_xlabel('flight trajectories per %d km cell' % (density_cell_size / 1000.0),
+                           fontsize=16)
+        print('- mapped density of flight trajectories from %d replicates' % len(rep_nums))
+    else:
+        for rep_num in rep_nums:
+            plot_replicate_trajectories(bmap, sim_date, rep_num)
+    #
+    plt.tight_layout()
+    plot_type = 'density' if use_density else 'trajectories'
+    if len(rep_nums) == 1:
+        fname = '%s_flight_%s_default_replicate_%s.png' % (sim_date, plot_type, rep_nums[0])
+    else:
+        fname = '%s_flight_%s_default_%d_replicates.png' % (sim_date, plot_type, len(rep_nums))
+    plt.savefig(fname, dpi=300, bbox_inches='tight')
+    print('- saved %s' % fname)
+    plt.close()
+    return
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
 
 # end plot_all_flights.py
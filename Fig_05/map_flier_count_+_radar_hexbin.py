@@ -9,127 +9,49 @@ Copyright (C) 2021 by Matthew Garcia
 """
 
 
+import os
 import sys
-import numpy as np
-import pandas as pd
-from matplotlib.cm import get_cmap
-from mpl_toolkits.basemap import Basemap
 import matplotlib as mpl
 mpl.use('Agg')
-import matplotlib.pyplot as plt
-
-
-bottom_lat, top_lat = 47.5, 49.5
-left_lon, right_lon = -69.1, -66.0
-radar_dBz_min, radar_dBz_max = -6, 24
-radar_lat, radar_lon = 48.4783, -67.5822
-
-
-def get_flier_locations(infname):
-    fliers_df = pd.read_csv(infname, index_col=None)
-    print('- found %d total fliers in plot area' % len(fliers_df))
-    lats = np.array(fliers_df['lat'])
-    lons = np.array(fliers_df['lon'])
-    return lats, lons
-
-
-def get_radar_field(infname):
-    radar_df = pd.read_csv(infname, index_col=False)
-    print('- found %d radar data rows' % len(radar_df))
-    lats = np.array(radar_df['latitude'])
-    lons = np.array(radar_df['longitude'])
-    refl = np.array(radar_df['reflectivity'])
-    refl_nan = np.where(refl < radar_dBz_min, np.nan, refl)
-    refl_nan = np.where(refl_nan > radar_dBz_max, np.nan, refl_nan)
-    return lats, lons, refl_nan
-
-
-def set_up_basemap():
-    mid_lat = (bottom_lat + top_lat) / 2.0
-    mid_lon = (left_lon + right_lon) / 2.0
-    bmap = Basemap(projection='tmerc', lon_0=mid_lon, lat_0=mid_lat,
-                   lat_ts=mid_lat, llcrnrlat=bottom_lat, llcrnrlon=left_lon,
-                   urcrnrlat=top_lat, urcrnrlon=right_lon, resolution='h',
-                   area_thresh=500)
-    bmap.drawcoastlines()
-    bmap.drawstates()
-    bmap.drawcountries()
-    bmap.drawmapboundary()
-    bmap.drawmapscale(lon=left_lon+0.4, lat=bottom_lat+0.2,
-                      lon0=mid_lon, lat0=mid_lat, length=40.0,
-                      barstyle='fancy')
-    parallels = np.arange(30., 60., 1.)
-    bmap.drawparallels(parallels, labels=[1, 0, 0, 0], fontsize=16)
-    meridians = np.arange(270., 360., 1.)
-    bmap.drawmeridians(meridians, labels=[0, 0, 0, 1], fontsize=16)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Common'))
+from parallel_jobs import parse_workers
+from flier_radar_maps import set_up_night, get_scans, plot_scans, score_scans
+
+
+settings = {'name': 'Fig_05',
+            'bottom_lat': 47.5, 'top_lat': 49.5,
+            'left_lon': -69.1, 'right_lon': -66.0,
+            'dBz_min': -6, 'dBz_max': 24,
+            'radar_lat': 48.4783, 'radar_lon': -67.5822,
+            'count_clevs': [50, 100, 150, 200, 250]}
+
+
+def main(args):
+    """map flier counts and radar reflectivity for the selected scans, or
+    score their agreement"""
+    print()
+    args, workers = parse_workers(list(args))
+    use_score = '--score' in args
+    if use_score:
+        args.remove('--score')
+    use_background = '--background' in args
+    if use_background:
+        args.remove('--background')
+    sim_date = args[0]
+    radar_date = args[1]
     #
-    x_min, y_min = bmap(left_lon, bottom_lat)
-    x_max, y_max = bmap(right_lon, top_lat)
-    extent = (x_min, x_max, y_min, y_max)
-    return bmap, extent
-
-
-def make_flier_count_hexbin_map(lats, lons, maxcount):
-    bmap, extent = set_up_basemap()
-    x, y = bmap(lons, lats)
-    hbin = bmap.hexbin(x, y, mincnt=1, extent=extent, gridsize=100,
-                       vmin=1, vmax=maxcount, cmap=get_cmap('viridis'))
-    cbar = plt.colorbar(pad=0.02, shrink=0.75)
-    count_clevs = [50, 100, 150, 200, 250]
-    cbar.set_ticks(count_clevs)
-    cbar.ax.set_yticklabels(count_clevs, fontsize=16, rotation=90, va='center')
-    cbar.ax.set_ylabel('flier count', fontsize=16)
-    return
-
-
-def make_radar_field_hexbin_map(lats, lons, refl_nan):
-    bmap, extent = set_up_basemap()
-    x, y = bmap(lons, lats)
-    hbin = bmap.hexbin(x, y, C=refl_nan, extent=extent, gridsize=100,
-                       vmin=radar_dBz_min, vmax=radar_dBz_max, cmap=get_cmap('viridis'))
-    radar_x, radar_y = bmap(radar_lon, radar_lat)
-    plt.plot(radar_x, radar_y, marker='+', markersize=20, c='orange')
-    cbar = plt.colorbar(pad=0.02, shrink=0.75)
-    count_clevs = [-5, 0, 5, 10, 15, 20]
-    cbar.set_ticks(count_clevs)
-    cbar.ax.set_yticklabels(count_clevs, fontsize=16, rotation=90, va='center')
-    cbar.ax.set_ylabel('reflectivity [dBz]', fontsize=16)
+    night, archive = set_up_night(settings, sim_date)
+    scans = get_scans(archive, sim_date, radar_date, args[2:])
+    print('found %d radar scan times to plot' % len(scans))
+    #
+    if use_score:
+        score_scans(night, scans)
+    else:
+        plot_scans(night, scans, use_background, workers)
     return
 
 
-print()
-sim_date = sys.argv[1]
-radar_date = sys.argv[2]
-radar_time = sys.argv[3]
-# 
-infname = '../Data/%s/Radar/XAM_fliers_hexbin_counts.csv' % sim_date
-print('reading %s' % infname.split('/')[-1])
-count_df = pd.read_csv(infname, index_col=None)
-fliers_maxcount = max(count_df['maxcount'])
-#
-fliers_infname = '../Data/%s/Radar/%s_%s_XAM_fliers.csv' % \
-    (sim_date, radar_date, str(radar_time).zfill(4))
-print('reading %s' % fliers_infname.split('/')[-1])
-flier_lats, flier_lons = get_flier_locations(fliers_infname)
-#
-radar_infname = '../Data/%s/Radar/cleaned_ref_ppi_xam_%s%s_1km.csv' % \
-    (sim_date, radar_date, str(radar_time).zfill(4))
-print('reading %s' % radar_infname.split('/')[-1])
-radar_lats, radar_lons, radar_refl = get_radar_field(radar_infname)
-#
-fig = plt.figure(figsize=(16, 8))
-print('plotting flier count')
-fig.add_subplot(1, 2, 1)
-make_flier_count_hexbin_map(flier_lats, flier_lons, fliers_maxcount)
-#
-print('plotting corresponding radar field')
-fig.add_subplot(1, 2, 2)
-make_radar_field_hexbin_map(radar_lats, radar_lons, radar_refl)
-# 
-plt.tight_layout()
-fname = '%s_%s_XAM_fliers_+_radar.png' % (radar_date, str(radar_time).zfill(4))
-plt.savefig(fname, dpi=300, bbox_inches='tight')
-print('- saved %s' % fname)
-plt.close()
+if __name__ == '__main__':
+    main(sys.argv[1:])
 
 # end map_flier_count_+_radar_hexbin.py
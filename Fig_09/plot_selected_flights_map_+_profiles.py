@@ -9,32 +9,21 @@ Copyright (C) 2021 by Matthew Garcia
 """
 
 
-import iso8601
+import os
+import sys
 import numpy as np
-import pandas as pd
 import matplotlib as mpl
 from matplotlib.cm import get_cmap
 from matplotlib.collections import LineCollection
-from mpl_toolkits.basemap import Basemap
 mpl.use('Agg')
 import matplotlib.pyplot as plt
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Common'))
+from basemap_cache import get_basemap
+from trajectory_store import get_trajectory_store
+from flight_profiles import flight_profiles, flight_summaries, get_profile
 
 
-def get_idxs(alt_all, sfc_all):
-    idx1 = 0
-    for idx, alt in enumerate(alt_all):
-        if alt > sfc_all[idx]:
-            idx1 = idx - 1
-            break
-    idx2 = -1
-    for idx in range(len(alt_all)-1, -1, -1):
-        if alt_all[idx] > sfc_all[idx]:
-            idx2 = idx + 2
-            break
-    return idx1, idx2
-
-
-def plot_profile(elapsed_time, alt, Temp, fname):
+def plot_profile(elapsed_time, alt, sfc, Temp, fname):
     fig = plt.figure(figsize=(8, 6))
     ax1 = fig.add_subplot(1,1,1)
     points = np.array([elapsed_time, alt]).T.reshape(-1, 1, 2)
@@ -71,91 +60,100 @@ def plot_profile(elapsed_time, alt, Temp, fname):
     return
 
 
-rep_num = 0
-flights = {'20130714' : ['000000101', '000000124'],
-           '20130715' : ['000000168', '000000820']}
-colors = ['red', 'orange', 'green', 'blue']
-styles = ['solid', 'dotted', 'dashed', 'dashdot']
-markers = [('a', "a'"), ('b', "b'"), ('c', "c'"), ('d', "d'")]
-#
-#
-# setup map
-bottom_lat, top_lat = 45.0, 51.0
-mid_lat = (bottom_lat + top_lat) / 2.0
-left_lon, right_lon = -73.0, -64.0
-mid_lon = (left_lon + right_lon) / 2.0
-#
-map1 = plt.figure(figsize=(8, 8))
-bmap = Basemap(projection='tmerc', lon_0=mid_lon, lat_0=mid_lat,
-               lat_ts=mid_lat, llcrnrlat=bottom_lat, llcrnrlon=left_lon,
-               urcrnrlat=top_lat, urcrnrlon=right_lon, resolution='h',
-               area_thresh=500)
-bmap.drawcoastlines()
-bmap.drawstates()
-bmap.drawcountries()
-bmap.drawmapboundary(fill_color='lightblue')
-bmap.fillcontinents(color='white', lake_color='lightblue')
-#
-bmap.drawmapscale(lon=left_lon+1.25, lat=top_lat-0.5, lon0=mid_lon, lat0=mid_lat, length=200.0,
-                  barstyle='fancy', fillcolor1='w', fillcolor2='k', fontsize=16)
-parallels = np.arange(30., 60., 1.)
-bmap.drawparallels(parallels, labels=[1, 0, 0, 0], fontsize=16)
-meridians = np.arange(270., 360., 1.)
-bmap.drawmeridians(meridians, labels=[0, 0, 0, 1], fontsize=16)
-#
-# plot individual flight profiles and map trajectories
-i = 0
-for sim_date, fliers in flights.items():
-    path = '../Data/%s/pyATM/WRF-NARR_d03_%s_simulation_%s_output' % \
-        (sim_date, sim_date, str(rep_num).zfill(5))
-    for flier in fliers:
-        infname = '%s/flier_%s_%s_%s_report.csv' % (path, str(rep_num).zfill(5), sim_date, flier)
-        print('reading %s' % infname.split('/')[-1])
-        df = pd.read_csv(infname, index_col=False)
-        #
-        date_time_all = list(df['date_time'])
-        lat_all = np.array(df['lat'])
-        lon_all = np.array(df['lon'])
-        alt_all = np.array(df['alt_MSL'])
-        sfc_all = np.array(df['sfc_elev'])
-        T_all = np.array(df['T'])
-        #
-        idx1, idx2 = get_idxs(alt_all, sfc_all)
-        date_time = date_time_all[idx1:idx2]
-        lat = lat_all[idx1:idx2]
-        lon = lon_all[idx1:idx2]
-        alt = alt_all[idx1:idx2]
-        sfc = sfc_all[idx1:idx2]
-        T = T_all[idx1:idx2]
-        #
-        init_time = iso8601.parse_date(date_time[0])
-        elapsed_time = list()
-        for tt in date_time:
-            tdiff = iso8601.parse_date(tt) - init_time
-            elapsed_time.append(tdiff.seconds / 60.0)
-        #
-        # plot all flight trajectories on common map
-        text_offset = 0.1
-        bmap.plot(lon[0], lat[0], '+', markersize=14, color='k', latlon=True)
-        x, y = bmap(lon[0]-text_offset, lat[0]+text_offset)
-        plt.text(x, y, markers[i][0], va='bottom', ha='center', fontsize=16)
-        bmap.plot(lon[-1], lat[-1], 'x', markersize=14, color='k', latlon=True)
-        x, y = bmap(lon[-1]+text_offset, lat[-1]-text_offset)
-        plt.text(x, y, markers[i][1], va='top', ha='center', fontsize=16)
-        bmap.plot(lon, lat, linewidth=4, color=colors[i], linestyle=styles[i],
-                  label='%s ... %s'% (markers[i][0], markers[i][1]), latlon=True)
-        #
-        # plot individual flight altitude/T profile
-        outfname = 'flier_%s_%s_%s_alt_T_profile.png' % (str(rep_num).zfill(5), sim_date, flier)
-        plot_profile(elapsed_time, alt, T, outfname)
-        #
-        i += 1
-#
-map1.legend(loc=(0.1, 0.06), fontsize=16, framealpha=1)
-map1.tight_layout()
-fname = 'combined_flight_profiles_map.png'
-map1.savefig(fname, dpi=300, bbox_inches='tight')
-print('saved figure %s' % fname)
-plt.close()
+def main(args):
+    """map the selected flights and plot their altitude/temperature profiles"""
+    print()
+    args = list(args)
+    query = None
+    if '--select' in args:
+        idx = args.index('--select')
+        query = args[idx+1]
+        del args[idx:idx+2]
+    count = 2
+    if '--count' in args:
+        idx = args.index('--count')
+        count = int(args[idx+1])
+        del args[idx:idx+2]
+    #
+    rep_num = 0
+    flights = {'20130714' : ['000000101', '000000124'],
+               '20130715' : ['000000168', '000000820']}
+    if args:
+        flights = {sim_date: flights.get(sim_date, []) for sim_date in args}
+    colors = ['red', 'orange', 'green', 'blue']
+    styles = ['solid', 'dotted', 'dashed', 'dashdot']
+    #
+    # setup map
+    bottom_lat, top_lat = 45.0, 51.0
+    mid_lat = (bottom_lat + top_lat) / 2.0
+    left_lon, right_lon = -73.0, -64.0
+    mid_lon = (left_lon + right_lon) / 2.0
+    #
+    map1 = plt.figure(figsize=(8, 8))
+    bmap = get_basemap(bottom_lat, top_lat, left_lon, right_lon)
+    bmap.drawcoastlines()
+    bmap.drawstates()
+    bmap.drawcountries()
+    bmap.drawmapboundary(fill_color='lightblue')
+    bmap.fillcontinents(color='white', lake_color='lightblue')
+    #
+    bmap.drawmapscale(lon=left_lon+1.25, lat=top_lat-0.5, lon0=mid_lon, lat0=mid_lat, length=200.0,
+                      barstyle='fancy', fillcolor1='w', fillcolor2='k', fontsize=16)
+    parallels = np.arange(30., 60., 1.)
+    bmap.drawparallels(parallels, labels=[1, 0, 0, 0], fontsize=16)
+    meridians = np.arange(270., 360., 1.)
+    bmap.drawmeridians(meridians, labels=[0, 0, 0, 1], fontsize=16)
+    #
+    # plot individual flight profiles and map trajectories
+    i = 0
+    for sim_date, fliers in flights.items():
+        path = '../Data/%s/pyATM/WRF-NARR_d03_%s_simulation_%s_output' % \
+            (sim_date, sim_date, str(rep_num).zfill(5))
+        store = get_trajectory_store(path)
+        profiles = flight_profiles(store)
+        summary = flight_summaries(profiles)
+        fname = '%s_flight_summaries_replicate_%s.csv' % (sim_date, str(rep_num).zfill(5))
+        summary.to_csv(fname, index_label='flier', float_format='%.2f')
+        print('- summarized %d flights in %s' % (len(summary), fname))
+        if query is not None:
+            selected = summary.query(query).sort_values('duration', ascending=False)
+            print('- %d of %d flights match "%s"' % (len(selected), len(summary), query))
+            fliers = list(selected.index[:count])
+        for flier in fliers:
+            print('plotting flight of flier %s' % flier)
+            flight = get_profile(profiles, flier, ['elapsed', 'lat', 'lon', 'alt_MSL', 'sfc_elev', 'T'])
+            lat, lon = flight['lat'], flight['lon']
+            markers = (chr(ord('a') + i), "%s'" % chr(ord('a') + i))
+            color, style = colors[i % len(colors)], styles[i % len(styles)]
+            #
+            # plot all flight trajectories on common map
+            text_offset = 0.1
+            bmap.plot(lon[0], lat[0], '+', markersize=14, color='k', latlon=True)
+            x, y = bmap(lon[0]-text_offset, lat[0]+text_offset)
+            plt.text(x, y, markers[0], va='bottom', ha='center', fontsize=16)
+            bmap.plot(lon[-1], lat[-1], 'x', markersize=14, color='k', latlon=True)
+            x, y = bmap(lon[-1]+text_offset, lat[-1]-text_offset)
+            plt.text(x, y, markers[1], va='top', ha='center', fontsize=16)
+            bmap.plot(lon, lat, linewidth=4, color=color, linestyle=style,
+                      label='%s ... %s'% markers, latlon=True)
+            #
+            # plot individual flight altitude/T profile
+            outfname = 'flier_%s_%s_%s_alt_T_profile.png' % (str(rep_num).zfill(5), sim_date, flier)
+            plot_profile(flight['elapsed'], flight['alt_MSL'], flight['sfc_elev'], flight['T'],
+                         outfname)
+            #
+            i += 1
+    #
+    map1.legend(loc=(0.1, 0.06), fontsize=16, framealpha=1)
+    map1.tight_layout()
+    fname = 'combined_flight_profiles_map.png'
+    map1.savefig(fname, dpi=300, bbox_inches='tight')
+    print('saved figure %s' % fname)
+    plt.close()
+    return
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
 
 # end plot_selected_flights_map_+_profiles.py
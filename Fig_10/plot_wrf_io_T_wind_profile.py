@@ -10,115 +10,137 @@ basic structure borrowed from wrf-python documentation
 """
 
 
+import os
 import sys
 from glob import glob
 import numpy as np
+import pandas as pd
 from netCDF4 import Dataset
-from wrf import getvar, to_np, latlon_coords, interp1d
 import matplotlib as mpl
 from matplotlib.cm import get_cmap
-from mpl_toolkits.basemap import Basemap
 mpl.use('Agg')
 import matplotlib.pyplot as plt
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Common'))
+from wrf_columns import read_columns, interp_columns
+from wrf_grid_index import get_grid_index, find_grid_yx
 
 
-def find_loc_xy(ncfname, plat, plon):
-    ncfile = Dataset(ncfname, 'r')
-    T2 = getvar(ncfile, 'T2')
-    xlats, xlons = latlon_coords(T2)
-    lats = to_np(xlats)
-    lons = to_np(xlons)
-    lats_offset = plat - lats
-    lons_offset = lons - plon
-    dist_offset = np.sqrt(lats_offset**2 + lons_offset**2)
-    shape = np.shape(dist_offset)
-    y, x = np.unravel_index(np.argmin(dist_offset, axis=None), shape)
-    return y, x
+def get_profile_points(args):
+    """profile points from lat/lon pairs, or from a CSV file with lat and lon columns"""
+    if args[0].endswith('.csv'):
+        print('reading profile points from %s' % args[0])
+        points_df = pd.read_csv(args[0], index_col=None)
+        plats = np.array(points_df['lat']).astype(np.float64)
+        plons = np.array(points_df['lon']).astype(np.float64)
+    else:
+        plats = np.array(args[0::2]).astype(np.float64)
+        plons = np.array(args[1::2]).astype(np.float64)
+    return plats, plons
 
 
-print()
-sim_date = sys.argv[1]
-profile_lat = np.float64(sys.argv[2])
-profile_lon = np.float64(sys.argv[3])
-#
-path = '../Data/%s/WRF' % sim_date
-ncfnames = sorted(glob('%s/*.nc' % path))
-print('found %d files' % len(ncfnames))
-print()
-#
-dates = list()
-times = list()
-for ncfname in ncfnames:
-    grid_num = int(ncfname.split('/')[-1].split('.')[0].split('_')[2][-1:])
-    date_str = ncfname.split('/')[-1].split('.')[0].split('_')[3]
-    time_str = ncfname.split('/')[-1].split('.')[0].split('_')[4][:2]
-    dates.append(date_str)
-    times.append(time_str)
-ntimes = len(times)
-#
-y, x = find_loc_xy(ncfnames[0], profile_lat, profile_lon)
-level_interval = 100  # m
-level_max = 1600  # m
-levels = np.arange(0, level_max+level_interval, level_interval).astype(int)
-nlevels = len(levels)
-T_panel = np.zeros((nlevels, ntimes))
-wind_panel = np.zeros_like(T_panel)
-#
-for i, ncfname in enumerate(ncfnames):
-    print('reading and interpolating T/wind profiles for %s' % ncfname)
-    ncfile = Dataset(ncfname, 'r')
-    Z_loc = getvar(ncfile, 'geopotential_height')[:, y, x]
-    T2_loc = getvar(ncfile, 'T2')[y, x]
-    T_loc = getvar(ncfile, 'temperature')[:, y, x]
-    U_loc = getvar(ncfile, 'ue_unstaggered')[:, y, x]
-    V_loc = getvar(ncfile, 've_unstaggered')[:, y, x]
-    T_profile = to_np(interp1d(T_loc, Z_loc, levels))
-    T_profile[0] = T2_loc
-    T_panel[:, i] = T_profile
-    U_profile = to_np(interp1d(U_loc, Z_loc, levels))
-    U10_loc = getvar(ncfile, 'u10_e')[y, x]
-    V_profile = to_np(interp1d(V_loc, Z_loc, levels))
-    V10_loc = getvar(ncfile, 'v10_e')[y, x]
-    wind_profile = np.sqrt(U_profile**2 + V_profile**2)
-    wind_profile[0] = np.sqrt(U10_loc**2 + V10_loc**2)
-    wind_panel[:, i] = wind_profile
-#
-fig = plt.figure(figsize=(8, 8))
-ax_T = fig.add_subplot(2,1,1)
-clevels = np.arange(4, 35)
-T_contours = plt.contourf(T_panel, levels=clevels, cmap=get_cmap('plasma'))
-cbar = plt.colorbar(T_contours, pad=0.02, shrink=0.95)
-labels = np.arange(4, 35, 3)
-cbar.ax.set_yticks(labels)
-cbar.ax.set_yticklabels(labels=labels, fontsize=16)
-cbar.ax.set_ylabel(r'$T$ [$^{\circ}$C]', fontsize=16)
-ax_T.set_xticks(np.arange(ntimes))
-ax_T.set_xticklabels(times, fontsize=16)
-ax_T.set_yticks(np.arange(nlevels)[::2])
-ax_T.set_yticklabels(levels[::2], fontsize=16)
-ax_T.set_ylabel('Altitude AMSL [m]', fontsize=16)
-#
-ax_wind = fig.add_subplot(2,1,2)
-clevels = np.arange(0, 25)
-wind_contours = plt.contourf(wind_panel, levels=clevels, cmap=get_cmap('Blues'))
-plt.clim(0, 24)
-cbar = plt.colorbar(wind_contours, pad=0.02, shrink=0.95)
-labels = np.arange(0, 25, 3)
-cbar.ax.set_yticks(labels)
-cbar.ax.set_yticklabels(labels=labels, fontsize=16)
-cbar.ax.set_ylabel('wind speed [m/s]', fontsize=16)
-ax_wind.set_xticks(np.arange(ntimes))
-ax_wind.set_xticklabels(times, fontsize=16)
-ax_wind.set_xlabel('Time [UTC]', fontsize=16)
-ax_wind.set_yticks(np.arange(nlevels)[::2])
-ax_wind.set_yticklabels(levels[::2], fontsize=16)
-ax_wind.set_ylabel('Altitude AMSL [m]', fontsize=16)
-#
-plt.tight_layout()
-fname = 'WRF_%s_%.1fN_%.1fW_T_wind_profiles.png' % (sim_date, profile_lat, abs(profile_lon))
-plt.savefig(fname, dpi=300, bbox_inches='tight')
-print('- saved %s' % fname)
-plt.close()
-print()
+def plot_profile_panels(T_panel, wind_panel, times, levels, fname):
+    """plot time-height panels of T and wind speed for one location"""
+    ntimes = len(times)
+    nlevels = len(levels)
+    fig = plt.figure(figsize=(8, 8))
+    ax_T = fig.add_subplot(2,1,1)
+    clevels = np.arange(4, 35)
+    T_contours = plt.contourf(T_panel, levels=clevels, cmap=get_cmap('plasma'))
+    cbar = plt.colorbar(T_contours, pad=0.02, shrink=0.95)
+    labels = np.arange(4, 35, 3)
+    cbar.ax.set_yticks(labels)
+    cbar.ax.set_yticklabels(labels=labels, fontsize=16)
+    cbar.ax.set_ylabel(r'$T$ [$^{\circ}$C]', fontsize=16)
+    ax_T.set_xticks(np.arange(ntimes))
+    ax_T.set_xticklabels(times, fontsize=16)
+    ax_T.set_yticks(np.arange(nlevels)[::2])
+    ax_T.set_yticklabels(levels[::2], fontsize=16)
+    ax_T.set_ylabel('Altitude AMSL [m]', fontsize=16)
+    #
+    ax_wind = fig.add_subplot(2,1,2)
+    clevels = np.arange(0, 25)
+    wind_contours = plt.contourf(wind_panel, levels=clevels, cmap=get_cmap('Blues'))
+    plt.clim(0, 24)
+    cbar = plt.colorbar(wind_contours, pad=0.02, shrink=0.95)
+    labels = np.arange(0, 25, 3)
+    cbar.ax.set_yticks(labels)
+    cbar.ax.set_yticklabels(labels=labels, fontsize=16)
+    cbar.ax.set_ylabel('wind speed [m/s]', fontsize=16)
+    ax_wind.set_xticks(np.arange(ntimes))
+    ax_wind.set_xticklabels(times, fontsize=16)
+    ax_wind.set_xlabel('Time [UTC]', fontsize=16)
+    ax_wind.set_yticks(np.arange(nlevels)[::2])
+    ax_wind.set_yticklabels(levels[::2], fontsize=16)
+    ax_wind.set_ylabel('Altitude AMSL [m]', fontsize=16)
+    #
+    plt.tight_layout()
+    plt.savefig(fname, dpi=300, bbox_inches='tight')
+    print('- saved %s' % fname)
+    plt.close()
+    return
+
+
+def main(args):
+    """plot WRF temperature/wind time-height profiles at the given locations"""
+    print()
+    sim_date = args[0]
+    profile_lats, profile_lons = get_profile_points(args[1:])
+    npoints = len(profile_lats)
+    print('extracting profiles at %d locations' % npoints)
+    #
+    path = '../Data/%s/WRF' % sim_date
+    ncfnames = sorted(glob('%s/*.nc' % path))
+    print('found %d files' % len(ncfnames))
+    print()
+    #
+    dates = list()
+    times = list()
+    for ncfname in ncfnames:
+        grid_num = int(ncfname.split('/')[-1].split('.')[0].split('_')[2][-1:])
+        date_str = ncfname.split('/')[-1].split('.')[0].split('_')[3]
+        time_str = ncfname.split('/')[-1].split('.')[0].split('_')[4][:2]
+        dates.append(date_str)
+        times.append(time_str)
+    ntimes = len(times)
+    #
+    grid_index = get_grid_index(ncfnames[0])
+    ys, xs = find_grid_yx(grid_index, profile_lats, profile_lons)
+    level_interval = 100  # m
+    level_max = 1600  # m
+    levels = np.arange(0, level_max+level_interval, level_interval).astype(int)
+    nlevels = len(levels)
+    T_panels = np.zeros((npoints, nlevels, ntimes))
+    wind_panels = np.zeros_like(T_panels)
+    #
+    for i, ncfname in enumerate(ncfnames):
+        print('reading and interpolating T/wind profiles for %s' % ncfname)
+        ncfile = Dataset(ncfname, 'r')
+        Z_cols = read_columns(ncfile, 'geopotential_height', ys, xs)
+        T_cols = read_columns(ncfile, 'temperature', ys, xs)
+        U_cols = read_columns(ncfile, 'ue_unstaggered', ys, xs)
+        V_cols = read_columns(ncfile, 've_unstaggered', ys, xs)
+        T2_locs = read_columns(ncfile, 'T2', ys, xs)[:, 0]
+        U10_locs = read_columns(ncfile, 'u10_e', ys, xs)[:, 0]
+        V10_locs = read_columns(ncfile, 'v10_e', ys, xs)[:, 0]
+        ncfile.close()
+        T_profiles = interp_columns(T_cols, Z_cols, levels)
+        T_profiles[:, 0] = T2_locs
+        T_panels[:, :, i] = T_profiles
+        U_profiles = interp_columns(U_cols, Z_cols, levels)
+        V_profiles = interp_columns(V_cols, Z_cols, levels)
+        wind_profiles = np.sqrt(U_profiles**2 + V_profiles**2)
+        wind_profiles[:, 0] = np.sqrt(U10_locs**2 + V10_locs**2)
+        wind_panels[:, :, i] = wind_profiles
+    #
+    for j in range(npoints):
+        fname = 'WRF_%s_%.1fN_%.1fW_T_wind_profiles.png' % \
+            (sim_date, profile_lats[j], abs(profile_lons[j]))
+        plot_profile_panels(T_panels[j], wind_panels[j], times, levels, fname)
+    print()
+    return
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
 
 # end map_wrf_io_T_wind_profiles.py
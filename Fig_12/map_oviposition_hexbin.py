@@ -9,77 +9,83 @@ Copyright (C) 2021 by Matthew Garcia
 """
 
 
+import os
 import sys
 from glob import glob
 import numpy as np
-import pandas as pd
 from matplotlib.cm import get_cmap
-from mpl_toolkits.basemap import Basemap
 import matplotlib as mpl
 mpl.use('Agg')
 import matplotlib.pyplot as plt
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Common'))
+from basemap_cache import get_basemap
+from csv_loader import iter_csv_files
+from hex_bins import hex_lattice, accumulate_hexbin, hexbin_values, draw_hexbin
 
 
-print()
-sim_date = sys.argv[1]
-#
-# setup map
-bottom_lat, top_lat = 45.0, 51.0
-mid_lat = (bottom_lat + top_lat) / 2.0
-left_lon, right_lon = -73.0, -64.0
-mid_lon = (left_lon + right_lon) / 2.0
-#
-plt.figure(figsize=(8, 8))
-bmap = Basemap(projection='tmerc', lon_0=mid_lon, lat_0=mid_lat,
-               lat_ts=mid_lat, llcrnrlat=bottom_lat, llcrnrlon=left_lon,
-               urcrnrlat=top_lat, urcrnrlon=right_lon, resolution='h',
-               area_thresh=500)
-bmap.drawcoastlines()
-bmap.drawstates()
-bmap.drawcountries()
-#
-# draw map references
-bmap.drawmapscale(lon=left_lon+1.25, lat=top_lat-0.5, lon0=mid_lon, lat0=mid_lat, length=200.0,
-                  barstyle='fancy', fillcolor1='w', fillcolor2='k', fontsize=16)
-parallels = np.arange(30., 60., 1.)
-bmap.drawparallels(parallels, labels=[1, 0, 0, 0], fontsize=16)
-meridians = np.arange(270., 360., 1.)
-bmap.drawmeridians(meridians, labels=[0, 0, 0, 1], fontsize=16)
-#
-path = '../Data/%s/PyATM/egg_deposition' % sim_date
-infnames = sorted(glob('%s/egg_deposition_*.csv' % path))
-print('found %d egg deposition location files' % len(infnames))
-#
-infname = infnames[0]
-print('reading locations from %s' % infname)
-locations_df = pd.read_csv(infname, index_col=False, low_memory=False)
-for infname in infnames[1:]:
-    print('reading locations from %s' % infname)
-    temp_df = pd.read_csv(infname, index_col=False, low_memory=False)
-    locations_df = pd.concat([locations_df, temp_df], axis=0)
-print('found %d data rows' % len(locations_df))
-#
-lons = np.array(locations_df['longitude'])
-lats = np.array(locations_df['latitude'])
-eggs = np.array(locations_df['n_eggs'])
-#
-print('plotting egg deposition counts by location')
-x, y = bmap(lons, lats)
-x_min, y_min = bmap(left_lon, bottom_lat)
-x_max, y_max = bmap(right_lon, top_lat)
-hbin = bmap.hexbin(x, y, C=eggs, extent=(x_min, x_max, y_min, y_max), gridsize=100,
-                   vmin=1, vmax=6E5, reduce_C_function=np.sum, cmap=get_cmap('viridis'))
-cbar = plt.colorbar(pad=0.02, shrink=0.7)
-count_clevs = [100000, 200000, 300000, 400000, 500000, 600000]
-cbar.set_ticks(count_clevs)
-count_clevs = ['{:.0e}'.format(x) for x in count_clevs]
-cbar.ax.set_yticklabels(count_clevs, rotation=90, va='center', fontsize=16)
-cbar.ax.set_ylabel('egg deposition count', fontsize=16)
-#
-plt.tight_layout()
-fname = '%s_egg_deposition_map.png' % sim_date
-plt.savefig(fname, dpi=300, bbox_inches='tight')
-print('- saved %s' % fname)
-plt.close()
+def main(args):
+    """map egg deposition for a night"""
+    print()
+    sim_date = args[0]
+    #
+    # setup map
+    bottom_lat, top_lat = 45.0, 51.0
+    mid_lat = (bottom_lat + top_lat) / 2.0
+    left_lon, right_lon = -73.0, -64.0
+    mid_lon = (left_lon + right_lon) / 2.0
+    #
+    plt.figure(figsize=(8, 8))
+    bmap = get_basemap(bottom_lat, top_lat, left_lon, right_lon)
+    bmap.drawcoastlines()
+    bmap.drawstates()
+    bmap.drawcountries()
+    #
+    # draw map references
+    bmap.drawmapscale(lon=left_lon+1.25, lat=top_lat-0.5, lon0=mid_lon, lat0=mid_lat, length=200.0,
+                      barstyle='fancy', fillcolor1='w', fillcolor2='k', fontsize=16)
+    parallels = np.arange(30., 60., 1.)
+    bmap.drawparallels(parallels, labels=[1, 0, 0, 0], fontsize=16)
+    meridians = np.arange(270., 360., 1.)
+    bmap.drawmeridians(meridians, labels=[0, 0, 0, 1], fontsize=16)
+    #
+    path = '../Data/%s/PyATM/egg_deposition' % sim_date
+    infnames = sorted(glob('%s/egg_deposition_*.csv' % path))
+    print('found %d egg deposition location files' % len(infnames))
+    #
+    x_min, y_min = bmap(left_lon, bottom_lat)
+    x_max, y_max = bmap(right_lon, top_lat)
+    lattice = hex_lattice((x_min, x_max, y_min, y_max), gridsize=100)
+    #
+    # bin egg deposition counts one file at a time
+    columns = {'longitude': np.float32, 'latitude': np.float32, 'n_eggs': np.float32}
+    totals = None
+    nrows = 0
+    for locations_df in iter_csv_files(infnames, columns):
+        x, y = bmap(np.array(locations_df['longitude']), np.array(locations_df['latitude']))
+        eggs = np.array(locations_df['n_eggs'])
+        totals = accumulate_hexbin(lattice, x, y, C=eggs, totals=totals)
+        nrows += len(locations_df)
+    print('found %d data rows' % nrows)
+    #
+    print('plotting egg deposition counts by location')
+    hbin = draw_hexbin(bmap, lattice, hexbin_values(totals, 'sum'),
+                       vmin=1, vmax=6E5, cmap=get_cmap('viridis'))
+    cbar = plt.colorbar(pad=0.02, shrink=0.7)
+    count_clevs = [100000, 200000, 300000, 400000, 500000, 600000]
+    cbar.set_ticks(count_clevs)
+    count_clevs = ['{:.0e}'.format(x) for x in count_clevs]
+    cbar.ax.set_yticklabels(count_clevs, rotation=90, va='center', fontsize=16)
+    cbar.ax.set_ylabel('egg deposition count', fontsize=16)
+    #
+    plt.tight_layout()
+    fname = '%s_egg_deposition_map.png' % sim_date
+    plt.savefig(fname, dpi=300, bbox_inches='tight')
+    print('- saved %s' % fname)
+    plt.close()
+    return
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
 
 # end map_oviposition_hexbin.py
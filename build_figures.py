@@ -0,0 +1,344 @@
+"""
+Python script "build_figures.py"
+by Matthew Garcia, Post-doctoral Research Associate
+Dept. of Forest and Wildlife Ecology
+University of Wisconsin - Madison
+matt.e.garcia@gmail.com
+
+Copyright (C) 2021 by Matthew Garcia
+
+Incremental build of the published figures. Each job in the table below
+runs one figure script with its arguments in its figure directory, reading
+the declared input files, and copies the files it produces to their final
+Fig_XX names. A job is skipped if its final outputs exist and nothing it
+depends on has changed since it last ran: the script, the Common modules it
+imports, its arguments, and the names, sizes and modification times of its
+input files. Independent jobs run in parallel; jobs that would build the
+same on-disk store or archive (e.g. a replicate's trajectory store, or the
+per-file WRF field cache that the pressure-level and surface map scripts
+both fill) are ordered with 'after'.
+
+With --in-process, the figure scripts are imported once, loading their
+heavy libraries (matplotlib, Basemap, wrf-python, netCDF4, pandas, GDAL),
+and each job calls its script's main() in a warm worker process forked from
+this one, instead of starting a new interpreter per job.
+
+usage: python build_figures.py [Fig_XX ...] [--workers N] [--force] [--dry-run] [--in-process]
+"""
+
+
+import os
+import re
+import sys
+import shutil
+import hashlib
+import traceback
+import subprocess
+import importlib.util
+import multiprocessing as mp
+from glob import glob
+from contextlib import redirect_stdout, redirect_stderr
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+repo_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(repo_dir, 'Common'))
+from parallel_jobs import parse_workers
+
+
+state_dir = os.path.join(repo_dir, 'Data', 'cache', 'build')
+scripts = dict()  # figure script modules loaded for in-process jobs, by script
+
+
+def figure_job(name, script, args, inputs, outputs, after=(), cwd=None):
+    """one figure job: run script (relative to the repository) with args in
+    directory cwd (default: the job's figure directory), reading the input
+    file patterns and writing {script output: final figure name} files"""
+    return {'name': name, 'script': script, 'args': [str(arg) for arg in args],
+            'inputs': list(inputs), 'outputs': dict(outputs), 'after': list(after),
+            'cwd': cwd if cwd is not None else '_'.join(name.split('_')[:2])}
+
+
+def wrf_files(sim_date):
+    """a night's WRF output files"""
+    return 'Data/%s/WRF/*.nc' % sim_date
+
+
+def flier_files(sim_date, rep_num=0):
+    """a replicate's individual flier output files"""
+    return 'Data/%s/pyATM/WRF-NARR_d03_%s_simulation_%s_output/flier_*_report.csv' % \
+        (sim_date, sim_date, str(rep_num).zfill(5))
+
+
+jobs = [
+    figure_job('Fig_01', 'Fig_01/map_defoliation_annotated.py', [],
+        ['Data/TBE_2013.tif'],
+        {'2013_defoliation_annotated.png': 'Fig_01.png'}),
+    figure_job('Fig_03_prs', 'Fig_03/map_wrf_io_T_wind_prs.py', ['20130714'],
+        [wrf_files('20130714')],
+        {'WRF_d03_2013-07-15_00:00_windspeed_900hPa.png': 'Fig_03a.png',
+         'WRF_d03_2013-07-15_06:00_windspeed_900hPa.png': 'Fig_03b.png'}),
+    figure_job('Fig_03_sfc', 'Fig_03/map_wrf_io_T_wind_sfc.py', ['20130714'],
+        [wrf_files('20130714')],
+        {'WRF_d03_2013-07-15_00:00_T_wind_sfc.png': 'Fig_03c.png',
+         'WRF_d03_2013-07-15_06:00_T_wind_sfc.png': 'Fig_03d.png'},
+        after=['Fig_03_prs']),
+    figure_job('Fig_04', 'Fig_04/plot_all_flights.py', ['20130714', 0],
+        [wrf_files('20130714'), flier_files('20130714')],
+        {'20130714_flight_trajectories_default_replicate_00000.png': 'Fig_04.png'}),
+    figure_job('Fig_05', 'Fig_05/map_flier_count_+_radar_hexbin.py', ['20130714', '20130715', '0429', '0629'],
+        ['Data/20130714/Radar/*.csv'],
+        {'20130715_0429_XAM_fliers_+_radar.png': 'Fig_05ab.png',
+         '20130715_0629_XAM_fliers_+_radar.png': 'Fig_05cd.png'}),
+    figure_job('Fig_06_prs', 'Fig_03/map_wrf_io_T_wind_prs.py', ['20130715'],
+        [wrf_files('20130715')],
+        {'WRF_d03_2013-07-16_00:00_windspeed_900hPa.png': 'Fig_06a.png',
+         'WRF_d03_2013-07-16_06:00_windspeed_900hPa.png': 'Fig_06b.png'}),
+    figure_job('Fig_06_sfc', 'Fig_03/map_wrf_io_T_wind_sfc.py', ['20130715'],
+        [wrf_files('20130715')],
+        {'WRF_d03_2013-07-16_00:00_T_wind_sfc.png': 'Fig_06c.png',
+         'WRF_d03_2013-07-16_06:00_T_wind_sfc.png': 'Fig_06d.png'},
+        after=['Fig_06_prs']),
+    figure_job('Fig_07', 'Fig_04/plot_all_flights.py', ['20130715', 0],
+        [wrf_files('20130715'), flier_files('20130715')],
+        {'20130715_flight_trajectories_default_replicate_00000.png': 'Fig_07.png'}),
+    figure_job('Fig_08', 'Fig_08/map_flier_count_+_radar_hexbin.py', ['20130715', '20130716', '0159', '0359'],
+        ['Data/20130715/Radar/*.csv'],
+        {'20130716_0159_XAM_fliers_+_radar.png': 'Fig_08ab.png',
+         '20130716_0359_XAM_fliers_+_radar.png': 'Fig_08cd.png'}),
+    figure_job('Fig_09', 'Fig_09/plot_selected_flights_map_+_profiles.py', [],
+        [flier_files('20130714'), flier_files('20130715')],
+        {'combined_flight_profiles_map.png': 'Fig_09_map.png',
+         'flier_00000_20130714_000000101_alt_T_profile.png': 'Fig_09a.png',
+         'flier_00000_20130714_000000124_alt_T_profile.png': 'Fig_09b.png',
+         'flier_00000_20130715_000000168_alt_T_profile.png': 'Fig_09c.png',
+         'flier_00000_20130715_000000820_alt_T_profile.png': 'Fig_09d.png'},
+        after=['Fig_04', 'Fig_07']),
+    figure_job('Fig_10_a', 'Fig_10/plot_wrf_io_T_wind_profile.py', ['20130714', 48.5, -69.0],
+        [wrf_files('20130714')],
+        {'WRF_20130714_48.5N_69.0W_T_wind_profiles.png': 'Fig_10a.png'}),
+    figure_job('Fig_10_b', 'Fig_10/plot_wrf_io_T_wind_profile.py', ['20130715', 49.0, -68.0],
+        [wrf_files('20130715')],
+        {'WRF_20130715_49.0N_68.0W_T_wind_profiles.png': 'Fig_10b.png'}),
+    figure_job('Fig_11_a', 'Fig_11/plot_flight_altitude_combined_histograms.py', [],
+        ['Data/2013071[45]/pyATM/default_flight_alt*_histogram.csv'],
+        {'default_flight_alt_combined_histograms.png': 'Fig_11a.png'}),
+    figure_job('Fig_11_b', 'Fig_11/plot_flight_distance_combined_histograms.py', [],
+        ['Data/2013071[45]/pyATM/default_flight_dist*_histogram.csv'],
+        {'default_flight_dist_combined_histograms.png': 'Fig_11b.png'}),
+    figure_job('Fig_12_a', 'Fig_12/map_oviposition_hexbin.py', ['20130714'],
+        ['Data/20130714/PyATM/egg_deposition/egg_deposition_*.csv'],
+        {'20130714_egg_deposition_map.png': 'Fig_12a.png'}),
+    figure_job('Fig_12_b', 'Fig_12/map_male_landings_female_imported_fecundity_hexbin.py', ['20130714'],
+        ['Data/20130714/PyATM/landing_locs/landing_locs_*.csv'],
+        {'20130714_male_landings_female_imported_fecundity_map.png': 'Fig_12b.png'}),
+    figure_job('Fig_12_c', 'Fig_12/map_oviposition_hexbin.py', ['20130715'],
+        ['Data/20130715/PyATM/egg_deposition/egg_deposition_*.csv'],
+        {'20130715_egg_deposition_map.png': 'Fig_12c.png'}),
+    figure_job('Fig_12_d', 'Fig_12/map_male_landings_female_imported_fecundity_hexbin.py', ['20130715'],
+        ['Data/20130715/PyATM/landing_locs/landing_locs_*.csv'],
+        {'20130715_male_landings_female_imported_fecundity_map.png': 'Fig_12d.png'}),
+]
+
+
+def script_modules(fname, modules=None):
+    """Common modules imported by a script, directly or through other
+    Common modules"""
+    if modules is None:
+        modules = list()
+    with open(fname) as f:
+        text = f.read()
+    for name in re.findall(r'^(?:from|import) (\w+)', text, re.MULTILINE):
+        module_fname = os.path.join(repo_dir, 'Common', '%s.py' % name)
+        if os.path.exists(module_fname) and (module_fname not in modules):
+            modules.append(module_fname)
+            script_modules(module_fname, modules)
+    return modules
+
+
+def job_inputs(job):
+    """input files of a job, in a fixed order"""
+    fnames = list()
+    for pattern in job['inputs']:
+        fnames.extend(sorted(glob(os.path.join(repo_dir, pattern))))
+    return fnames
+
+
+def job_key(job):
+    """identify a job's code, arguments and input files"""
+    script = os.path.join(repo_dir, job['script'])
+    sha = hashlib.sha1(('%s\n' % ' '.join(job['args'])).encode())
+    for fname in [script] + sorted(script_modules(script)):
+        with open(fname, 'rb') as f:
+            sha.update(f.read())
+    for fname in job_inputs(job):
+        stat = os.stat(fname)
+        sha.update(('%s|%d|%d\n' % (os.path.relpath(fname, repo_dir), stat.st_size,
+                                    stat.st_mtime_ns)).encode())
+    return sha.hexdigest()[:16]
+
+
+def key_fname(job):
+    """file recording the key of a job's last successful run"""
+    return os.path.join(state_dir, '%s.key' % job['name'])
+
+
+def is_up_to_date(job, key):
+    """True if the job last ran with the same key and its outputs exist"""
+    if not os.path.exists(key_fname(job)):
+        return False
+    with open(key_fname(job)) as f:
+        if f.read().strip() != key:
+            return False
+    return all(os.path.exists(os.path.join(repo_dir, job['cwd'], fig_name))
+               for fig_name in job['outputs'].values())
+
+
+def finish_job(job, key, log_fname):
+    """copy a finished job's outputs to their final figure names and record
+    its key; returns True on success"""
+    cwd = os.path.join(repo_dir, job['cwd'])
+    for out_name, fig_name in job['outputs'].items():
+        if not os.path.exists(os.path.join(cwd, out_name)):
+            print('- %s did not produce %s, see %s' % (job['name'], out_name, log_fname))
+            return False
+        shutil.copyfile(os.path.join(cwd, out_name), os.path.join(cwd, fig_name))
+    with open(key_fname(job), 'w') as f:
+        f.write('%s\n' % key)
+    print('- %s done: %s' % (job['name'], ', '.join(job['outputs'].values())))
+    return True
+
+
+def run_job(job, key):
+    """run a job's script in a new interpreter, logging its output, and
+    copy its outputs to their final figure names; returns True on success"""
+    cwd = os.path.join(repo_dir, job['cwd'])
+    log_fname = os.path.join(state_dir, '%s.log' % job['name'])
+    script = os.path.relpath(os.path.join(repo_dir, job['script']), cwd)
+    with open(log_fname, 'w') as log:
+        result = subprocess.run([sys.executable, script] + job['args'], cwd=cwd,
+                                stdout=log, stderr=subprocess.STDOUT)
+    if result.returncode != 0:
+        print('- %s failed (exit code %d), see %s' % (job['name'], result.returncode, log_fname))
+        return False
+    return finish_job(job, key, log_fname)
+
+
+def load_script(script):
+    """import a figure script (relative to the repository) as a module,
+    once; its main() is not run"""
+    if script not in scripts:
+        name = 'figure_%s' % re.sub(r'\W', '_', os.path.splitext(script)[0])
+        spec = importlib.util.spec_from_file_location(name, os.path.join(repo_dir, script))
+        module = importlib.util.module_from_spec(spec)
+        # registered, so that functions the script passes to run_jobs pickle
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+        scripts[script] = module
+    return scripts[script]
+
+
+def call_job(job, key):
+    """call a job's script main() in this process, logging its output, and
+    copy its outputs to their final figure names; returns True on success"""
+    cwd = os.path.join(repo_dir, job['cwd'])
+    log_fname = os.path.join(state_dir, '%s.log' % job['name'])
+    module = load_script(job['script'])
+    os.chdir(cwd)
+    status = 0
+    with open(log_fname, 'w') as log, redirect_stdout(log), redirect_stderr(log):
+        try:
+            module.main(job['args'])
+        except SystemExit as e:
+            status = e.code
+        except Exception:
+            traceback.print_exc()
+            status = 1
+        finally:
+            # figures left open by a failed job would accumulate in this worker
+            pyplot = sys.modules.get('matplotlib.pyplot')
+            if pyplot is not None:
+                pyplot.close('all')
+    if status:
+        print('- %s failed (%s), see %s' % (job['name'], status, log_fname))
+        return False
+    return finish_job(job, key, log_fname)
+
+
+def build(selected, workers=1, force=False, dry_run=False, in_process=False):
+    """run the out-of-date jobs among the selected ones, respecting their
+    order constraints; returns the names of failed jobs"""
+    os.makedirs(state_dir, exist_ok=True)
+    if in_process and not dry_run:
+        # import every selected script here, so that the worker processes
+        # forked below start with all of their libraries loaded; jobs run in
+        # separate processes since pyplot state and the working directory
+        # are per-process
+        print('loading %d figure scripts' % len(set(job['script'] for job in selected)))
+        for job in selected:
+            load_script(job['script'])
+        pool = ProcessPoolExecutor(max_workers=max(1, workers), mp_context=mp.get_context('fork'))
+        runner = call_job
+    else:
+        pool = ThreadPoolExecutor(max_workers=max(1, workers))
+        runner = run_job
+    names = [job['name'] for job in selected]
+    pending = {job['name']: job for job in selected}
+    running = dict()
+    done = set()
+    failed = set()
+    with pool:
+        while pending or running:
+            npending = len(pending)
+            for name, job in list(pending.items()):
+                after = [dep for dep in job['after'] if dep in names]
+                if any(dep in failed for dep in after):
+                    print('- %s skipped, since %s failed' %
+                          (name, ', '.join(dep for dep in after if dep in failed)))
+                    failed.add(name)
+                    del pending[name]
+                elif all(dep in done for dep in after):
+                    key = job_key(job)
+                    if (not force) and is_up_to_date(job, key):
+                        print('- %s is up to date' % name)
+                        done.add(name)
+                        del pending[name]
+                    elif dry_run:
+                        print('- %s would run' % name)
+                        done.add(name)
+                        del pending[name]
+                    elif len(running) < workers:
+                        print('- running %s' % name)
+                        running[pool.submit(runner, job, key)] = name
+                        del pending[name]
+            if not running:
+                if len(pending) == npending:
+                    raise ValueError('circular job order: %s' % ', '.join(pending))
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                if future.result():
+                    done.add(name)
+                else:
+                    failed.add(name)
+    return failed
+
+
+print()
+args, workers = parse_workers(sys.argv[1:])
+force = '--force' in args
+if force:
+    args.remove('--force')
+dry_run = '--dry-run' in args
+if dry_run:
+    args.remove('--dry-run')
+in_process = '--in-process' in args
+if in_process:
+    args.remove('--in-process')
+selected = [job for job in jobs if (not args) or
+            any(job['name'].startswith(arg) for arg in args)]
+print('%d of %d figure jobs selected, on up to %d workers' % (len(selected), len(jobs), workers))
+failed = build(selected, workers, force, dry_run, in_process)
+if failed:
+    sys.exit('%d figure jobs failed: %s' % (len(failed), ', '.join(sorted(failed))))
+
+# end build_figures.py
@@ -0,0 +1,11 @@
+"""
+pytest configuration: the shared modules are imported from Common, as the
+figure scripts do
+"""
+
+
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Common'))
+
+# end conftest.py
@@ -0,0 +1,75 @@
+"""
+checks of the hex_bins lattice and accumulation against matplotlib's hexbin()
+"""
+
+
+import numpy as np
+import pytest
+import matplotlib as mpl
+mpl.use('Agg')
+import matplotlib.pyplot as plt
+from hex_bins import hex_lattice, accumulate_hexbin, hexbin_values
+
+
+extent = (0.0, 1000.0, -200.0, 600.0)
+
+
+def random_points(npoints=5000, seed=0):
+    """random points over the extent, plus points on its edges and corners"""
+    rng = np.random.default_rng(seed)
+    xmin, xmax, ymin, ymax = extent
+    x = rng.uniform(xmin, xmax, npoints)
+    y = rng.uniform(ymin, ymax, npoints)
+    edge = np.linspace(0.0, 1.0, 41)
+    x = np.concatenate([x, xmin + edge * (xmax - xmin), xmin + edge * (xmax - xmin),
+                        np.full(41, xmin), np.full(41, xmax)])
+    y = np.concatenate([y, np.full(41, ymin), np.full(41, ymax),
+                        ymin + edge * (ymax - ymin), ymin + edge * (ymax - ymin)])
+    C = rng.normal(size=len(x))
+    return x, y, C
+
+
+def mpl_hexbin(x, y, C=None, gridsize=100, **kwargs):
+    """hexagon centers and values from matplotlib's hexbin()"""
+    fig = plt.figure()
+    collection = plt.hexbin(x, y, C=C, gridsize=gridsize, extent=extent, mincnt=1, **kwargs)
+    offsets = np.array(collection.get_offsets())
+    values = np.array(collection.get_array())
+    plt.close(fig)
+    return offsets, values
+
+
+@pytest.mark.parametrize('gridsize', [100, 37])
+def test_counts_match_hexbin(gridsize):
+    x, y, _ = random_points()
+    lattice = hex_lattice(extent, gridsize)
+    values = hexbin_values(accumulate_hexbin(lattice, x, y), 'count')
+    good = ~np.isnan(values)
+    offsets, expected = mpl_hexbin(x, y, gridsize=gridsize)
+    assert np.allclose(lattice['centers'][good], offsets)
+    assert np.array_equal(values[good], expected)
+    assert np.sum(values[good]) == len(x)
+
+
+@pytest.mark.parametrize('gridsize', [100, 37])
+def test_sums_match_hexbin(gridsize):
+    x, y, C = random_points(seed=1)
+    lattice = hex_lattice(extent, gridsize)
+    values = hexbin_values(accumulate_hexbin(lattice, x, y, C=C), 'sum')
+    good = ~np.isnan(values)
+    offsets, expected = mpl_hexbin(x, y, C, gridsize=gridsize, reduce_C_function=np.sum)
+    assert np.allclose(lattice['centers'][good], offsets)
+    assert np.allclose(values[good], expected)
+
+
+def test_chunks_match_one_pass():
+    x, y, C = random_points(seed=2)
+    lattice = hex_lattice(extent)
+    totals = None
+    for chunk in np.array_split(np.arange(len(x)), 7):
+        totals = accumulate_hexbin(lattice, x[chunk], y[chunk], C=C[chunk], totals=totals)
+    one_pass = accumulate_hexbin(lattice, x, y, C=C)
+    assert np.array_equal(totals['count'], one_pass['count'])
+    assert np.allclose(totals['sum'], one_pass['sum'])
+
+# end test_hex_bins.py
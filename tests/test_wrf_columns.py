@@ -0,0 +1,90 @@
+"""
+checks of WRF column reads against full-grid fields
+"""
+
+
+import os
+from glob import glob
+import numpy as np
+import pytest
+from netCDF4 import Dataset
+from wrf_columns import read_columns
+
+
+data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Data')
+
+
+def write_wrf_file(fname, stand_lon=-68.0):
+    """small Lambert-conformal WRF-like file with staggered winds"""
+    nz, ny, nx = 3, 4, 5
+    rng = np.random.default_rng(1)
+    ncfile = Dataset(fname, 'w')
+    ncfile.setncatts({'MAP_PROJ': 1, 'TRUELAT1': 30.0, 'TRUELAT2': 60.0,
+                      'STAND_LON': stand_lon, 'CEN_LON': stand_lon})
+    for dim, size in [('Time', 1), ('bottom_top', nz), ('south_north', ny),
+                      ('west_east', nx), ('south_north_stag', ny+1),
+                      ('west_east_stag', nx+1)]:
+        ncfile.createDimension(dim, size)
+    lats, lons = np.meshgrid(np.linspace(46.0, 50.0, ny), np.linspace(-72.0, -64.0, nx),
+                             indexing='ij')
+    for name, dims, values in [
+            ('XLAT', ('Time', 'south_north', 'west_east'), lats),
+            ('XLONG', ('Time', 'south_north', 'west_east'), lons),
+            ('U', ('Time', 'bottom_top', 'south_north', 'west_east_stag'),
+             rng.normal(size=(nz, ny, nx+1))),
+            ('V', ('Time', 'bottom_top', 'south_north_stag', 'west_east'),
+             rng.normal(size=(nz, ny+1, nx))),
+            ('U10', ('Time', 'south_north', 'west_east'), rng.normal(size=(ny, nx))),
+            ('V10', ('Time', 'south_north', 'west_east'), rng.normal(size=(ny, nx)))]:
+        var = ncfile.createVariable(name, 'f8', dims)
+        var[0] = values
+    ncfile.close()
+    return
+
+
+def test_earth_winds_rotate_grid_winds(tmp_path):
+    fname = str(tmp_path / 'wrfout_test.nc')
+    write_wrf_file(fname)
+    ys, xs = np.array([1, 2, 2]), np.array([0, 2, 4])
+    ncfile = Dataset(fname, 'r')
+    ue = read_columns(ncfile, 'ue_unstaggered', ys, xs)
+    ve = read_columns(ncfile, 've_unstaggered', ys, xs)
+    U = ncfile.variables['U'][0]
+    V = ncfile.variables['V'][0]
+    u10e = read_columns(ncfile, 'u10_e', ys, xs)[:, 0]
+    v10e = read_columns(ncfile, 'v10_e', ys, xs)[:, 0]
+    U10 = ncfile.variables['U10'][0]
+    V10 = ncfile.variables['V10'][0]
+    ncfile.close()
+    u = 0.5 * (U[:, ys, xs] + U[:, ys, xs+1]).T
+    v = 0.5 * (V[:, ys, xs] + V[:, ys+1, xs]).T
+    u10, v10 = U10[ys, xs], V10[ys, xs]
+    # rotation keeps speeds, and is none on the standard longitude (x = 2)
+    assert np.allclose(ue**2 + ve**2, u**2 + v**2)
+    assert np.allclose(ue[1], u[1]) and np.allclose(ve[1], v[1])
+    assert not np.allclose(ue[0], u[0])
+    # earth east turns counterclockwise from grid east east of the standard
+    # longitude, so a grid-north wind there has an eastward component
+    angle = np.arctan2(ve[2], ue[2]) - np.arctan2(v[2], u[2])
+    assert np.all(np.sin(angle) < 0.0)
+    assert np.allclose(u10e**2 + v10e**2, u10**2 + v10**2)
+    assert np.allclose([u10e[1], v10e[1]], [u10[1], v10[1]])
+
+
+@pytest.mark.parametrize('varname', ['ue_unstaggered', 've_unstaggered',
+                                     'u10_e', 'v10_e', 'temperature',
+                                     'geopotential_height'])
+def test_columns_match_getvar(varname):
+    wrf = pytest.importorskip('wrf')
+    ncfnames = sorted(glob(os.path.join(data_dir, '*', 'WRF', '*.nc')))
+    if not ncfnames:
+        pytest.skip('no WRF data files')
+    ncfile = Dataset(ncfnames[0], 'r')
+    ny, nx = ncfile.variables['XLAT'].shape[-2:]
+    y, x = ny // 2, nx // 3
+    column = read_columns(ncfile, varname, [y], [x])[0]
+    expected = np.ravel(wrf.to_np(wrf.getvar(ncfile, varname)[..., y, x]))
+    ncfile.close()
+    assert np.allclose(column, expected, rtol=1.0e-4, atol=1.0e-3)
+
+# end test_wrf_columns.py